@@ -0,0 +1,75 @@
+# asset_server.py
+# Tiny local HTTP endpoint serving AssetStore blobs by content-hashed URL.
+# URLs never change meaning (ID = content hash), so responses are cached forever.
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from asset_store import AssetStore
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+PREFIX = "/a/"
+
+
+def make_handler(store: AssetStore):
+    class AssetHandler(BaseHTTPRequestHandler):
+        def _asset_id(self) -> Optional[str]:
+            path = self.path.split("?", 1)[0]
+            if not path.startswith(PREFIX):
+                return None
+            return path[len(PREFIX):].split(".", 1)[0]  # "/a/<id>.png" -> "<id>"
+
+        def _send(self, body: bool):
+            aid = self._asset_id()
+            if not aid or aid not in store:
+                self.send_error(404)
+                return
+            etag = f'"{aid}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", IMMUTABLE)
+                self.end_headers()
+                return
+            data = store.get(aid)
+            self.send_response(200)
+            self.send_header("Content-Type", store.mime(aid))
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", IMMUTABLE)
+            self.send_header("ETag", etag)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            if body:
+                self.wfile.write(data)
+
+        def do_GET(self):
+            self._send(body=True)
+
+        def do_HEAD(self):
+            self._send(body=False)
+
+        def log_message(self, format, *args):
+            pass  # keep the Streamlit console quiet
+
+    return AssetHandler
+
+
+def start_asset_server(store: AssetStore, host: str = "0.0.0.0", port: int = 8502,
+                       tries: int = 1) -> ThreadingHTTPServer:
+    """Serve `store` on a daemon thread and return the running server.
+
+    Binds the first free port of `port` .. `port + tries - 1` (several app
+    processes on one host each need their own); OSError if none is free.
+    """
+    for p in range(port, port + max(tries, 1)):
+        try:
+            server = ThreadingHTTPServer((host, p), make_handler(store))
+            break
+        except OSError as e:
+            error = e
+    else:
+        raise OSError(f"no free port in {port}-{port + max(tries, 1) - 1} for the asset server: {error}")
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="asset-server", daemon=True).start()
+    return server
@@ -0,0 +1,178 @@
+# asset_store.py
+# Process-wide, read-only image store shared by every Streamlit session.
+# Sessions keep only asset IDs; the bytes live here once, LRU-bounded by size.
+# With a content store (cas.py), files are ingested by hash and read back
+# through its shared mmap views instead of being re-read by path.
+
+import base64, hashlib, os, threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+MIME_BY_EXT = {
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".css": "text/css",
+}
+
+EXT_BY_MIME = {mime: ext for ext, mime in reversed(list(MIME_BY_EXT.items()))}
+
+def guess_mime(path: str) -> str:
+    return MIME_BY_EXT.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+def content_id(data: bytes) -> str:
+    """Asset ID = first 16 hex chars of the SHA-256 of the content."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class AssetStore:
+    """Blobs keyed by content hash, evicted least-recently-used once over `max_bytes`.
+
+    Every ID remembers how to reload itself (file path or render callable), so an
+    evicted asset is transparently re-read on its next access.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024, cas=None):
+        self.max_bytes = max_bytes
+        self.cas = cas
+        self._lock = threading.Lock()
+        self._blobs: "OrderedDict[str, list]" = OrderedDict()   # id -> [raw, b64 or None]
+        self._file_ids: Dict[Tuple[str, int, int], str] = {}    # (path, mtime_ns, size) -> id
+        self._gen_ids: Dict[Hashable, str] = {}                 # render key -> id
+        self._sources: Dict[str, Callable[[], bytes]] = {}      # id -> reloader
+        self._mime: Dict[str, str] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ----- registration -----
+    def add_file(self, path: str, sha256: Optional[str] = None) -> str:
+        """Register a file; re-reads only when its mtime or size changed.
+
+        With `sha256` (the content hash from the deck index, which DeckLoader
+        recompiles when an asset is edited) the asset is looked up by that hash
+        alone, without touching the file, with or without a content store.
+        """
+        if sha256:
+            with self._lock:
+                if sha256[:16] in self._sources:
+                    return sha256[:16]
+        path = os.path.abspath(path)
+        st_ = os.stat(path)
+        key = (path, st_.st_mtime_ns, st_.st_size)
+        with self._lock:
+            aid = None if sha256 else self._file_ids.get(key)
+            if aid is not None:
+                return aid
+        if self.cas is not None:
+            sha = self.cas.put_file(path, sha256)
+            aid, data = sha[:16], self.cas.view(sha)
+            source = lambda s=sha: self.cas.view(s)
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+            aid = content_id(data)
+            source = lambda p=path: _read(p)
+        with self._lock:
+            if not sha256:
+                self._file_ids[key] = aid  # only what was actually read from the path
+            self._sources[aid] = source
+            self._mime[aid] = guess_mime(path)
+            self._insert(aid, data)
+        return aid
+
+    def add_generated(self, key: Hashable, render: Callable[[], bytes], mime: str = "image/png") -> str:
+        """Register bytes produced by `render()`; rendered at most once per key while cached."""
+        with self._lock:
+            aid = self._gen_ids.get(key)
+            if aid is not None:
+                return aid
+        data = render()
+        aid = content_id(data)
+        with self._lock:
+            self._gen_ids[key] = aid
+            self._sources[aid] = render
+            self._mime[aid] = mime
+            self._insert(aid, data)
+        return aid
+
+    # ----- lookup -----
+    def get(self, asset_id: str) -> bytes:
+        return self._entry(asset_id)[0]
+
+    def b64(self, asset_id: str) -> str:
+        entry = self._entry(asset_id)
+        if entry[1] is None:
+            encoded = base64.b64encode(entry[0]).decode("ascii")
+            with self._lock:
+                if entry[1] is None and self._blobs.get(asset_id) is entry:
+                    entry[1] = encoded
+                    self._bytes += len(encoded)
+                    self._evict()
+            return encoded
+        return entry[1]
+
+    def data_uri(self, asset_id: str) -> str:
+        return f"data:{self.mime(asset_id)};base64,{self.b64(asset_id)}"
+
+    def mime(self, asset_id: str) -> str:
+        return self._mime.get(asset_id, "application/octet-stream")
+
+    def ext(self, asset_id: str) -> str:
+        return EXT_BY_MIME.get(self.mime(asset_id), "")
+
+    def __contains__(self, asset_id: str) -> bool:
+        return asset_id in self._sources
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._blobs),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    # ----- internals -----
+    def _entry(self, asset_id: str) -> list:
+        with self._lock:
+            entry = self._blobs.get(asset_id)
+            if entry is not None:
+                self._blobs.move_to_end(asset_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            source = self._sources.get(asset_id)
+        if source is None:
+            raise KeyError(asset_id)
+        data = source()
+        with self._lock:
+            return self._insert(asset_id, data)
+
+    def _insert(self, asset_id: str, data: bytes) -> list:
+        # caller holds the lock
+        entry = self._blobs.get(asset_id)
+        if entry is None:
+            entry = [data, None]
+            self._blobs[asset_id] = entry
+            self._bytes += len(data)
+        self._blobs.move_to_end(asset_id)
+        self._evict()
+        return entry
+
+    def _evict(self):
+        # caller holds the lock; always keep the most recent entry
+        while self._bytes > self.max_bytes and len(self._blobs) > 1:
+            _, (raw, b64) = self._blobs.popitem(last=False)
+            self._bytes -= len(raw) + (len(b64) if b64 else 0)
+            self.evictions += 1
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
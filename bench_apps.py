@@ -0,0 +1,226 @@
+# bench_apps.py
+# Headless benchmarks for shuffle.py and card_backs.py via Streamlit's AppTest.
+# Runs offline; reports p50/p95 rerun latency, payload bytes per rerun and peak
+# Python memory for each interaction, and compares against a JSON baseline.
+#
+#   python bench_apps.py --out bench_baseline.json          # record a baseline
+#   python bench_apps.py --compare bench_baseline.json      # fail on regressions
+#   TTX_ASSET_MODE=server python bench_apps.py --only shuffle
+
+import argparse, json, os, platform, statistics, subprocess, sys, time, tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+os.environ["TTX_STATE_DB"] = ""  # benchmark rooms stay in memory (no .cache/rooms.sqlite3 writes)
+
+SHUFFLE = "shuffle.py"
+CARD_BACKS = "card_backs.py"
+PHASE_NAMES = [
+    "Phase 1 – Detection & Analysis",
+    "Phase 2 – Containment & Eradication",
+    "Phase 3 – Recovery",
+    "Phase 4 – Post-Incident",
+]
+TIMEOUT = 60
+METRICS = ("p50_ms", "p95_ms", "payload_bytes", "peak_kb")
+
+
+def new_app(path: str):
+    from streamlit.testing.v1 import AppTest
+    return AppTest.from_file(path, default_timeout=TIMEOUT)
+
+def payload(at) -> Dict[str, int]:
+    """Serialized size of every element the last run emitted, split by kind."""
+    sizes = {"markdown_bytes": 0, "image_bytes": 0, "payload_bytes": 0}
+
+    def walk(node):
+        children = getattr(node, "children", None)
+        if children is not None:
+            for child in children.values():
+                walk(child)
+            return
+        proto = getattr(node, "proto", None)
+        size = proto.ByteSize() if proto is not None and hasattr(proto, "ByteSize") else 0
+        kind = getattr(node, "type", "")
+        if kind == "markdown":
+            sizes["markdown_bytes"] += size
+        elif kind in ("imgs", "image"):
+            sizes["image_bytes"] += size
+        sizes["payload_bytes"] += size
+
+    walk(at.main)
+    walk(at.sidebar)
+    return sizes
+
+def find_button(at, label: str):
+    for b in list(at.button) + list(at.sidebar.button):
+        if b.label == label:
+            return b
+    raise LookupError(label)
+
+def flipped_zoom_key(at) -> str:
+    """Key of the first enabled Zoom button (run after a flip)."""
+    for b in at.button:
+        if b.key and b.key.startswith("zoom_") and not b.disabled:
+            return b.key
+    raise LookupError("no zoomable card")
+
+
+# ----- scenarios: (app, setup(at) -> None, action(at) -> None) -----
+def _noop(at):
+    pass
+
+def _run(at):
+    at.run()
+
+def _flip(phase: str):
+    return lambda at: at.button(key=f"flip_{phase}_0").click().run()
+
+def _flip_first(at):
+    at.button(key=f"flip_{PHASE_NAMES[0]}_0").click().run()
+
+def _zoom_open(at):
+    at.button(key=flipped_zoom_key(at)).click().run()
+
+def _zoom_close(at):
+    find_button(at, "✕ Close Zoom").click().run()
+
+def _setup_zoomed(at):
+    at.run()
+    _flip_first(at)
+    _zoom_open(at)
+
+def _setup_flipped(at):
+    at.run()
+    _flip_first(at)
+
+def _cb_setup_zoomed(at):
+    at.run()
+    at.button(key="flip_0").click().run()
+    at.button(key="zoom_0").click().run()
+
+def _cb_sweep(at):
+    for step in range(11):
+        at.slider[0].set_value(round(1.0 + 0.1 * step, 1)).run()
+
+SCENARIOS: Dict[str, Tuple[str, Callable, Callable]] = {
+    "shuffle/init": (SHUFFLE, _noop, _run),
+    **{f"shuffle/flip_phase{i + 1}": (SHUFFLE, _run, _flip(ph)) for i, ph in enumerate(PHASE_NAMES)},
+    "shuffle/zoom_open": (SHUFFLE, _setup_flipped, _zoom_open),
+    "shuffle/zoom_close": (SHUFFLE, _setup_zoomed, _zoom_close),
+    "shuffle/shuffle_unflipped": (SHUFFLE, _run,
+                                  lambda at: at.sidebar.button(key=f"shuf_{PHASE_NAMES[0]}").click().run()),
+    "shuffle/reset_all": (SHUFFLE, _setup_flipped, lambda at: find_button(at, "🔄 Reset All").click().run()),
+    "card_backs/init": (CARD_BACKS, _noop, _run),
+    "card_backs/flip": (CARD_BACKS, _run, lambda at: at.button(key="flip_0").click().run()),
+    "card_backs/zoom_open": (CARD_BACKS, lambda at: (at.run(), at.button(key="flip_0").click().run()),
+                             lambda at: at.button(key="zoom_0").click().run()),
+    "card_backs/zoom_slider_sweep": (CARD_BACKS, _cb_setup_zoomed, _cb_sweep),
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def summarize(samples: List[float], sizes: Dict[str, int], peak: int) -> Dict:
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1e3, 2),
+        "p95_ms": round(percentile(samples, 95) * 1e3, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1e3, 2),
+        **sizes,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+def bench_scenario(name: str, repeat: int) -> Dict:
+    app, setup, action = SCENARIOS[name]
+    samples, peak, sizes = [], 0, {}
+    for _ in range(repeat):
+        at = new_app(app)
+        setup(at)
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        action(at)
+        samples.append(time.perf_counter() - t0)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].value}")
+        sizes = payload(at)
+    return summarize(samples, sizes, peak)
+
+def bench_cold_start(app: str, repeat: int) -> Dict:
+    """Fresh interpreter per sample: imports, module-level work and the first run."""
+    code = ("import time, tracemalloc; tracemalloc.start(); t0 = time.perf_counter();"
+            "from streamlit.testing.v1 import AppTest;"
+            f"at = AppTest.from_file({app!r}, default_timeout={TIMEOUT}); at.run();"
+            "print(time.perf_counter() - t0, tracemalloc.get_traced_memory()[1])")
+    samples, peak = [], 0
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        elapsed, p = out.stdout.split()[-2:]
+        samples.append(float(elapsed))
+        peak = max(peak, int(p))
+    return summarize(samples, {}, peak)
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Human-readable regressions: any metric more than `tolerance` above baseline."""
+    regressions = []
+    for name, cur in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric in METRICS:
+            if metric in cur and base.get(metric):
+                ratio = cur[metric] / base[metric]
+                if ratio > 1 + tolerance:
+                    regressions.append(f"{name}: {metric} {base[metric]} -> {cur[metric]} (+{(ratio - 1) * 100:.0f}%)")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark shuffle.py / card_backs.py reruns with AppTest.")
+    ap.add_argument("--repeat", type=int, default=10)
+    ap.add_argument("--cold-repeat", type=int, default=3)
+    ap.add_argument("--only", default="", help="substring filter on scenario names")
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    ap.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = ap.parse_args(argv)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "asset_mode": os.environ.get("TTX_ASSET_MODE", "inline"),
+            "repeat": args.repeat,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+    for app in (SHUFFLE, CARD_BACKS):
+        name = f"{os.path.splitext(app)[0]}/cold_start"
+        if args.only in name:
+            results["scenarios"][name] = bench_cold_start(app, args.cold_repeat)
+    for name in SCENARIOS:
+        if args.only in name:
+            results["scenarios"][name] = bench_scenario(name, args.repeat)
+
+    for name, r in results["scenarios"].items():
+        print(f"{name:32} p50 {r['p50_ms']:8.1f} ms  p95 {r['p95_ms']:8.1f} ms  "
+              f"payload {r.get('payload_bytes', 0) / 1e3:9.1f} kB  peak {r['peak_kb'] / 1e3:7.1f} MB")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
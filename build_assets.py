@@ -0,0 +1,289 @@
+# build_assets.py
+# Offline derivative builder for the card images in assets/.
+# Turns every source PNG into a board-size and a zoom-size variant in WebP
+# (plus AVIF when Pillow supports it), the page background into a screen-size
+# variant, and writes a manifest read by shuffle.py. Each manifest entry also
+# carries a tiny inline preview (a data URI of a few hundred bytes) that the
+# app paints under the real image until it arrives.
+#
+#   python build_assets.py                 # incremental build into assets/build
+#   python build_assets.py --force --jobs 4
+#
+# Incremental by content hash: a source whose SHA-256 matches the manifest and
+# whose outputs still exist is skipped.
+#
+#   python build_assets.py --atlas         # also pack the deck's back into a sprite sheet
+#
+# Atlas mode packs the board-size card back(s) into a sprite sheet plus a
+# coordinate map (atlas.json), rebuilt only when the deck version (deck file +
+# asset hashes) changes. Fronts are never atlased: a sheet of fronts would hand
+# every browser that loads it the questions still face down, so each front stays
+# its own URL, fetched on flip.
+
+import argparse, base64, hashlib, io, json, math, os, sys, time
+from typing import Dict, List, Optional
+
+SRC_DIR = "assets"
+OUT_DIR = os.path.join("assets", "build")
+MANIFEST_NAME = "manifest.json"
+ATLAS_NAME = "atlas.json"
+ATLAS_BACK = "__back__"   # atlas key of the card back
+ATLAS_LAYOUT = 3          # bump when the sheet grouping changes (3: backs only)
+PIPELINE_VERSION = 3  # bump when variant sizes/encoders change
+
+# Board slots are 288x432 (shuffle.CARD_W/CARD_H); render at 2x for HiDPI screens.
+# The zoom overlay caps at 900 px wide.
+BOARD_SLOT = (288, 432)
+VARIANTS = {
+    "board": {"box": (BOARD_SLOT[0] * 2, BOARD_SLOT[1] * 2), "quality": 80},
+    "zoom":  {"box": (900, 1350), "quality": 85},
+    "screen": {"box": (1920, 1080), "quality": 72},
+}
+PROFILES = {
+    "card": ("board", "zoom"),
+    "background": ("screen",),
+}
+EXTRA_SOURCES = {"BG.png": "background"}  # outside src_dir, keyed by path
+PREVIEW_BOX = {"card": (16, 24), "background": (32, 18)}  # stretched (and so blurred) by the browser
+PREVIEW_QUALITY = 40
+FORMATS = ("webp", "avif")
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def available_formats() -> List[str]:
+    from PIL import features
+    return [fmt for fmt in FORMATS if features.check(fmt)]
+
+def load_manifest(out_dir: str = OUT_DIR) -> Dict:
+    """Return the manifest in `out_dir`, or an empty one if none was built yet."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": PIPELINE_VERSION, "assets": {}}
+    if manifest.get("version") != PIPELINE_VERSION:
+        return {"version": PIPELINE_VERSION, "assets": {}}
+    return manifest
+
+def _outputs_exist(entry: Dict, out_dir: str) -> bool:
+    return all(os.path.exists(os.path.join(out_dir, v["file"])) for v in entry.get("variants", {}).values())
+
+def _preview(im, box) -> str:
+    """Data URI of a micro-thumbnail of `im` (WebP, PNG if Pillow lacks WebP)."""
+    from PIL import Image
+
+    small = im.copy()
+    small.thumbnail(box, Image.LANCZOS)
+    buf = io.BytesIO()
+    try:
+        small.save(buf, format="WEBP", quality=PREVIEW_QUALITY)
+        mime = "image/webp"
+    except (KeyError, OSError):
+        buf = io.BytesIO()
+        small.save(buf, format="PNG", optimize=True)
+        mime = "image/png"
+    return f"data:{mime};base64,{base64.b64encode(buf.getvalue()).decode('ascii')}"
+
+def _build_one(src_path: str, out_dir: str, sha: str, formats: List[str], profile: str) -> Dict:
+    """Worker: encode every variant of one source image. Runs in a child process."""
+    from PIL import Image
+
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    with Image.open(src_path) as im:
+        im.load()
+        width, height = im.size
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.getbands() else "RGB")
+        variants = {}
+        for name in PROFILES[profile]:
+            spec = VARIANTS[name]
+            resized = im.copy()
+            resized.thumbnail(spec["box"], Image.LANCZOS)
+            for fmt in formats:
+                rel = os.path.join(name, f"{stem}.{sha[:12]}.{fmt}")
+                path = os.path.join(out_dir, rel)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                save_kw = {"quality": spec["quality"]}
+                if fmt == "webp":
+                    save_kw["method"] = 6
+                resized.save(tmp, format=fmt.upper(), **save_kw)
+                os.replace(tmp, path)
+                variants[f"{name}.{fmt}"] = {
+                    "file": rel.replace(os.sep, "/"),
+                    "format": fmt,
+                    "width": resized.width,
+                    "height": resized.height,
+                    "bytes": os.path.getsize(path),
+                }
+        preview = _preview(im, PREVIEW_BOX[profile])
+    st_ = os.stat(src_path)
+    return {
+        "src": src_path.replace(os.sep, "/"),
+        "profile": profile,
+        "sha256": sha,
+        "width": width,
+        "height": height,
+        "bytes": st_.st_size,
+        "mtime_ns": st_.st_mtime_ns,
+        "variants": variants,
+        "preview": preview,
+    }
+
+def build_derivatives(src_dir: str = SRC_DIR, out_dir: str = OUT_DIR, jobs: Optional[int] = None,
+                      force: bool = False, formats: Optional[List[str]] = None,
+                      extra_sources: Optional[Dict[str, str]] = None) -> Dict:
+    """Build variants for every PNG in `src_dir` (plus `extra_sources`, path -> profile)
+    and write the manifest. Returns the manifest."""
+    formats = list(formats or available_formats())
+    old = {} if force else load_manifest(out_dir)["assets"]
+    extra = EXTRA_SOURCES if extra_sources is None else extra_sources
+    sources = [(n, os.path.join(src_dir, n), "card")
+               for n in sorted(os.listdir(src_dir)) if n.lower().endswith(".png")]
+    sources += [(path, path, profile) for path, profile in extra.items() if os.path.exists(path)]
+
+    assets: Dict[str, Dict] = {}
+    todo = []
+    for name, path, profile in sources:
+        sha = sha256_file(path)
+        prev = old.get(name)
+        if (prev and prev.get("sha256") == sha and prev.get("profile") == profile
+                and _outputs_exist(prev, out_dir)
+                and all(any(k.endswith("." + f) for k in prev["variants"]) for f in formats)):
+            prev["mtime_ns"] = os.stat(path).st_mtime_ns  # content unchanged, refresh stat
+            assets[name] = prev
+        else:
+            todo.append((name, path, sha, profile))
+
+    if todo:
+        os.makedirs(out_dir, exist_ok=True)
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {name: pool.submit(_build_one, path, out_dir, sha, formats, profile)
+                       for name, path, sha, profile in todo}
+            for name, fut in futures.items():
+                assets[name] = fut.result()
+
+    manifest = {"version": PIPELINE_VERSION, "src_dir": src_dir, "formats": formats,
+                "assets": dict(sorted(assets.items()))}
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+    manifest["built"] = [name for name, _, _, _ in todo]
+    return manifest
+
+
+# ---------- Atlas ----------
+def load_atlas(out_dir: str = OUT_DIR) -> Dict:
+    """Coordinate map written by build_atlas, or {} if none was built yet."""
+    try:
+        with open(os.path.join(out_dir, ATLAS_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _build_sheet(index: int, cells: List[tuple], out_dir: str, fmt: str) -> Dict:
+    """Worker: paste `cells` [(key, path or None, story)] into one sheet. Child process."""
+    import io
+    from PIL import Image, ImageOps
+    from placeholders import back_png, front_png
+
+    cw, ch = VARIANTS["board"]["box"]
+    cols = math.ceil(math.sqrt(len(cells)))
+    rows = math.ceil(len(cells) / cols)
+    sheet = Image.new("RGB", (cols * cw, rows * ch), (16, 34, 64))
+    coords = {}
+    for k, (key, path, story) in enumerate(cells):
+        if path:
+            img = Image.open(path)
+        elif key == ATLAS_BACK:
+            img = Image.open(io.BytesIO(back_png(*BOARD_SLOT)))
+        else:
+            img = Image.open(io.BytesIO(front_png(key, story, *BOARD_SLOT)))
+        # same crop the board applies with object-fit: cover
+        cell = ImageOps.fit(img.convert("RGB"), (cw, ch), Image.LANCZOS)
+        col, row = k % cols, k // cols
+        sheet.paste(cell, (col * cw, row * ch))
+        coords[key] = {"col": col, "row": row}
+    buf = io.BytesIO()
+    sheet.save(buf, format=fmt.upper(), quality=VARIANTS["board"]["quality"])
+    data = buf.getvalue()
+    rel = f"atlas/sheet{index}.{hashlib.sha256(data).hexdigest()[:12]}.{fmt}"
+    path = os.path.join(out_dir, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return {"file": rel, "cols": cols, "rows": rows, "bytes": len(data), "cards": coords}
+
+def build_atlas(deck_path: str, out_dir: str = OUT_DIR, fmt: str = "webp",
+                jobs: Optional[int] = None, force: bool = False) -> Dict:
+    """Pack the deck's back into a sprite sheet; writes and returns atlas.json."""
+    from deck import compile_deck
+
+    deck = compile_deck(deck_path)
+    old = load_atlas(out_dir)
+    if (not force and old.get("deck_version") == deck.version and old.get("layout") == ATLAS_LAYOUT
+            and all(os.path.exists(os.path.join(out_dir, sh["file"])) for sh in old.get("sheets", []))):
+        return old
+
+    chunks = [[(ATLAS_BACK, deck.back.path, "")]]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        sheets = list(pool.map(_build_sheet, range(len(chunks)), chunks,
+                               [out_dir] * len(chunks), [fmt] * len(chunks)))
+
+    atlas = {"deck_version": deck.version, "layout": ATLAS_LAYOUT, "cell": list(VARIANTS["board"]["box"]), "sheets": [], "cards": {}}
+    for i, sh in enumerate(sheets):
+        for key, pos in sh.pop("cards").items():
+            atlas["cards"][key] = {"sheet": i, **pos}
+        atlas["sheets"].append(sh)
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = os.path.join(out_dir, ATLAS_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(atlas, f, indent=1)
+    os.replace(tmp, os.path.join(out_dir, ATLAS_NAME))
+    return atlas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Build board/zoom/screen WebP/AVIF variants of image assets.")
+    ap.add_argument("--src", default=SRC_DIR)
+    ap.add_argument("--out", default=OUT_DIR)
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="rebuild everything, ignoring the manifest")
+    ap.add_argument("--formats", default=None, help="comma list, e.g. webp or webp,avif")
+    ap.add_argument("--atlas", action="store_true", help="also build the card-back sprite sheet for --deck")
+    ap.add_argument("--deck", default=os.environ.get("TTX_DECK", os.path.join("decks", "ttx.json")))
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    formats = args.formats.split(",") if args.formats else None
+    manifest = build_derivatives(args.src, args.out, jobs=args.jobs, force=args.force, formats=formats)
+    src_total = var_total = 0
+    for name, entry in manifest["assets"].items():
+        smallest = min((v["bytes"] for v in entry["variants"].values()), default=0)
+        src_total += entry["bytes"]
+        var_total += smallest
+        mark = "built" if name in manifest["built"] else "fresh"
+        print(f"{name:14} {entry['bytes'] / 1e3:8.0f} kB -> {smallest / 1e3:6.0f} kB  [{mark}]")
+    ratio = src_total / var_total if var_total else 0
+    print(f"{len(manifest['built'])} built, {len(manifest['assets'])} total, "
+          f"smallest variant {ratio:.1f}x smaller, {time.perf_counter() - t0:.1f}s")
+    if args.atlas:
+        atlas = build_atlas(args.deck, args.out, jobs=args.jobs, force=args.force)
+        sheets = atlas["sheets"]
+        print(f"atlas: {len(atlas['cards'])} cards in {len(sheets)} sheet(s), "
+              f"{sum(sh['bytes'] for sh in sheets) / 1e3:.0f} kB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
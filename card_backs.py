@@ -1,66 +1,53 @@
 # streamlit_app.py
 # Minimal demo: flip a card, then zoom that exact card. Close Zoom is a normal button.
 
-import base64, io, textwrap
+import base64
 import streamlit as st
-from PIL import Image, ImageDraw, ImageOps, ImageFont
+from placeholders import back_png, front_png
+from zoom_pyramid import ZoomPyramid
 
 st.set_page_config(page_title="Zoom Test", page_icon="🔎", layout="wide")
 
 CARD_W, CARD_H = 360, 540
 
 # ----- helpers -----
-def get_font(size: int):
-    try:
-        return ImageFont.truetype("DejaVuSans-Bold.ttf", size)
-    except Exception:
-        return ImageFont.load_default()
+# Placeholders come from the shared, memoized renderer (fonts + PNG bytes).
+def make_back() -> bytes:
+    return back_png(CARD_W, CARD_H)
 
-def make_back()->Image.Image:
-    NAVY=(16,34,64); WHITE=(248,251,255)
-    img = Image.new("RGB", (CARD_W, CARD_H), NAVY)
-    d = ImageDraw.Draw(img)
-    for x in range(-CARD_H, CARD_W+CARD_H, 36):
-        d.line([(x,0),(x+CARD_H,CARD_H)], fill=(255,255,255,32), width=2)
-    d.text((CARD_W//2, CARD_H//2-40), "🦉", anchor="mm", fill=WHITE)
-    img = ImageOps.expand(img, border=8, fill=(240,244,252))
-    img = ImageOps.expand(img, border=3, fill=(220,226,236))
-    return img
+def make_front(label: str, subtitle: str) -> bytes:
+    return front_png(label, subtitle, CARD_W, CARD_H, label_size=72)
 
-def make_front(label:str, subtitle:str)->Image.Image:
-    NAVY=(16,34,64); STRIPE=(208,213,221); LIGHT=(236,240,248)
-    img = Image.new("RGB", (CARD_W, CARD_H), NAVY)
-    d = ImageDraw.Draw(img)
-    d.rectangle([0, int(CARD_H*0.16), CARD_W, int(CARD_H*0.19)], fill=STRIPE)
-    d.rectangle([0, int(CARD_H*0.72), CARD_W, int(CARD_H*0.75)], fill=STRIPE)
-    d.text((CARD_W//2, int(CARD_H*0.30)), label, anchor="mm", fill=LIGHT, font=get_font(72))
-    txt = textwrap.fill(subtitle, width=22)
-    d.multiline_text((CARD_W//2, int(CARD_H*0.55)), txt, anchor="mm", fill=LIGHT, font=get_font(24), align="center")
-    img = ImageOps.expand(img, border=8, fill=(240,244,252))
-    img = ImageOps.expand(img, border=3, fill=(220,226,236))
-    return img
+def png_to_b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
 
-def pil_to_b64(img: Image.Image) -> str:
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return base64.b64encode(buf.getvalue()).decode("ascii")
+@st.cache_resource
+def zoom_pyramid() -> ZoomPyramid:
+    """Process-wide zoom levels (1.0–2.0) per card, built in background threads."""
+    return ZoomPyramid((CARD_W, CARD_H))
+
+def front_bytes(card) -> bytes:
+    return base64.b64decode(card["front"])
 
 # ----- state -----
 if "cards" not in st.session_state:
-    back_b64 = pil_to_b64(make_back())
+    back_b64 = png_to_b64(make_back())
     demo = [("Q1","Activate CIRP?"), ("Q2","First containment?"), ("Q3","HR calm comms?")]
     st.session_state.cards = []
     for q, sub in demo:
         st.session_state.cards.append({
             "id": q,
-            "front": pil_to_b64(make_front(q, sub)),
+            "front": png_to_b64(make_front(q, sub)),
             "back": back_b64,
             "flipped": False,
         })
     st.session_state.zoom_index = None  # None or int
 
 def flip(i:int):
-    st.session_state.cards[i]["flipped"] = True
+    card = st.session_state.cards[i]
+    card["flipped"] = True
+    # start building every zoom level now, off the request thread
+    zoom_pyramid().prefetch(card["id"], lambda: front_bytes(card))
 
 def open_zoom(i:int):
     st.session_state.zoom_index = i
@@ -90,9 +77,8 @@ if st.session_state.zoom_index is not None:
     st.subheader("🔎 Zoomed Card")
     idx = st.session_state.zoom_index
     card = st.session_state.cards[idx]
-    big = Image.open(io.BytesIO(base64.b64decode(card["front"])))
-    # upscale for presentation
+    # upscale for presentation; every step is precomputed, so this is a lookup
     scale = st.slider("Zoom", 1.0, 2.0, 1.6, 0.1, help="Adjust on the fly")
-    big_resized = big.resize((int(CARD_W*scale), int(CARD_H*scale)))
+    big_resized = zoom_pyramid().get(card["id"], lambda: front_bytes(card), scale)
     st.image(big_resized, use_column_width=False)
     st.button("✕ Close Zoom", on_click=close_zoom, type="primary")
@@ -0,0 +1,212 @@
+# cas.py
+# Content-addressed blob store for image assets.
+# Blobs live once under <root>/objects/<2 hex>/<62 hex> named by their SHA-256,
+# whatever path or deck they came from. Callers that already know a file's hash
+# (the deck index does) resolve it by that hash alone. index.json maps each
+# ingested path to its hash, but a saved entry is only trusted after the file
+# has been hashed once in this process; after that, mtime and size revalidate it.
+# Reads go through one read-only mmap per blob, shared by every session in the
+# process, and each blob is hash-checked the first time it is mapped.
+#
+#   python cas.py ingest                 # assets/, BG.png, owl.png, images/
+#   python cas.py ingest decks/other/    # more files or directories
+#   python cas.py verify                 # re-hash every object and indexed path
+#   python cas.py stats
+
+import argparse, hashlib, json, mmap, os, shutil, sys, threading
+from typing import Dict, Iterable, List, Optional, Set
+
+CAS_DIR = os.environ.get("TTX_CAS_DIR", ".cas")
+INDEX_NAME = "index.json"
+DEFAULT_SOURCES = ("assets", "BG.png", "owl.png", "images")
+IMAGE_EXTS = (".png", ".webp", ".avif", ".jpg", ".jpeg")
+
+
+class CASError(ValueError):
+    """A blob is missing or does not match its hash."""
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ContentStore:
+    def __init__(self, root: str = CAS_DIR, verify_on_open: bool = True):
+        self.root = root
+        self.verify_on_open = verify_on_open
+        self._lock = threading.Lock()
+        self._maps: Dict[str, memoryview] = {}
+        self._index: Dict[str, Dict] = self._load_index()   # abspath -> {sha256, size, mtime_ns}
+        self._checked: Set[str] = set()                      # paths hashed by this process
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    # ----- paths and index -----
+    def object_path(self, sha: str) -> str:
+        return os.path.join(self.root, "objects", sha[:2], sha[2:])
+
+    def __contains__(self, sha: str) -> bool:
+        return os.path.exists(self.object_path(sha))
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(os.path.join(self.root, INDEX_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        # caller holds the lock
+        path = os.path.join(self.root, INDEX_NAME)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+    # ----- writes -----
+    def put_file(self, path: str, sha256: Optional[str] = None) -> str:
+        """Ingest a file (if new or changed) and return its SHA-256.
+
+        `sha256` is the caller's known hash of the content; when that blob is
+        already stored the file is not read at all.
+        """
+        if sha256 and sha256 in self:
+            return sha256
+        path = os.path.abspath(path)
+        st_ = os.stat(path)
+        with self._lock:
+            entry = self._index.get(path) if path in self._checked else None
+        if (entry and entry["mtime_ns"] == st_.st_mtime_ns and entry["size"] == st_.st_size
+                and entry["sha256"] in self):
+            return entry["sha256"]
+        sha = sha256_file(path)
+        if sha not in self:
+            dest = self.object_path(sha)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(path, tmp)
+            if sha256_file(tmp) != sha:
+                os.remove(tmp)
+                raise CASError(f"{path} changed while it was being stored")
+            os.replace(tmp, dest)
+        with self._lock:
+            self._index[path] = {"sha256": sha, "size": st_.st_size, "mtime_ns": st_.st_mtime_ns}
+            self._checked.add(path)
+            self._save_index()
+        return sha
+
+    def put_bytes(self, data: bytes) -> str:
+        sha = hashlib.sha256(data).hexdigest()
+        if sha not in self:
+            dest = self.object_path(sha)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, dest)
+        return sha
+
+    def ingest(self, sources: Iterable[str]) -> Dict[str, str]:
+        """Ingest every image under `sources` (files or directories); path -> sha256."""
+        out = {}
+        for src in sources:
+            if os.path.isdir(src):
+                for dirpath, _, files in os.walk(src):
+                    for name in sorted(files):
+                        if name.lower().endswith(IMAGE_EXTS):
+                            p = os.path.join(dirpath, name)
+                            out[p] = self.put_file(p)
+            elif os.path.isfile(src):
+                out[src] = self.put_file(src)
+        return out
+
+    # ----- reads -----
+    def view(self, sha: str) -> memoryview:
+        """Read-only view of a blob, mapped once per process and shared by all callers."""
+        with self._lock:
+            mv = self._maps.get(sha)
+        if mv is not None:
+            return mv
+        try:
+            with open(self.object_path(sha), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                mv = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b"")
+        except FileNotFoundError:
+            raise CASError(f"missing object {sha}") from None
+        if self.verify_on_open and hashlib.sha256(mv).hexdigest() != sha:
+            raise CASError(f"object {sha} is corrupt")
+        with self._lock:
+            return self._maps.setdefault(sha, mv)
+
+    def read(self, sha: str) -> bytes:
+        return bytes(self.view(sha))
+
+    # ----- maintenance -----
+    def verify(self) -> List[str]:
+        """Problems found: corrupt or missing objects, indexed paths that no longer match."""
+        problems = []
+        objects = os.path.join(self.root, "objects")
+        for prefix in sorted(os.listdir(objects)):
+            for rest in sorted(os.listdir(os.path.join(objects, prefix))):
+                if rest.endswith(".tmp"):
+                    continue
+                sha = prefix + rest
+                if sha256_file(os.path.join(objects, prefix, rest)) != sha:
+                    problems.append(f"corrupt object {sha}")
+        with self._lock:
+            index = dict(self._index)
+        for path, entry in sorted(index.items()):
+            if entry["sha256"] not in self:
+                problems.append(f"{path}: object {entry['sha256'][:16]} missing")
+            elif not os.path.exists(path):
+                problems.append(f"{path}: source removed")
+            elif sha256_file(path) != entry["sha256"]:
+                problems.append(f"{path}: source changed since ingest")
+        return problems
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            index = dict(self._index)
+        by_sha: Dict[str, int] = {}
+        for entry in index.values():
+            by_sha[entry["sha256"]] = entry["size"]
+        return {
+            "paths": len(index),
+            "objects": len(by_sha),
+            "bytes": sum(by_sha.values()),
+            "deduped_bytes": sum(e["size"] for e in index.values()) - sum(by_sha.values()),
+            "mapped": len(self._maps),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Content-addressed store for image assets.")
+    ap.add_argument("--root", default=CAS_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ing = sub.add_parser("ingest", help="store files and directories of images")
+    ing.add_argument("paths", nargs="*", default=list(DEFAULT_SOURCES))
+    sub.add_parser("verify", help="re-hash every object and indexed path")
+    sub.add_parser("stats")
+    args = ap.parse_args(argv)
+
+    store = ContentStore(args.root)
+    if args.cmd == "ingest":
+        for path, sha in store.ingest(args.paths).items():
+            print(f"{sha[:16]}  {path}")
+    elif args.cmd == "verify":
+        problems = store.verify()
+        for line in problems:
+            print("BAD", line)
+        print(f"{len(problems)} problem(s)")
+        return 1 if problems else 0
+    s = store.stats()
+    print(f"{s['paths']} paths -> {s['objects']} objects, {s['bytes'] / 1e3:.0f} kB "
+          f"({s['deduped_bytes'] / 1e3:.0f} kB saved by dedupe)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
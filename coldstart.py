@@ -0,0 +1,103 @@
+# coldstart.py
+# Import-time budget for the apps. Runs a fresh interpreter with
+# `python -X importtime`, importing everything an app imports at module level,
+# and reports the cumulative cost per import, the heaviest modules and whether
+# modules meant to stay lazy (PIL, numpy, sqlite3, ...) were loaded eagerly.
+#
+#   python coldstart.py                          # shuffle.py, report only
+#   python coldstart.py --budget-ms 600 --forbid PIL,sqlite3   # CI gate
+#   python coldstart.py --app card_backs.py --json coldstart.json
+
+import argparse, ast, json, re, subprocess, sys
+from typing import Dict, List, Optional
+
+LAZY = ("PIL", "numpy", "sqlite3", "multiprocessing", "http.server")  # imported on first use only
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def top_level_imports(app: str) -> List[str]:
+    """Module names the app imports unconditionally (module-level statements only)."""
+    with open(app, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), app)
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+def measure(modules: List[str]) -> List[Dict]:
+    """Parsed -X importtime rows: module, self_us, cumulative_us, depth (0 = top level)."""
+    code = "; ".join(f"import {m}" for m in modules)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                         capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in out.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            rows.append({"module": m.group(4), "self_us": int(m.group(1)),
+                         "cumulative_us": int(m.group(2)), "depth": len(m.group(3)) // 2})
+    return rows
+
+def report(app: str, repeat: int = 3, watch=LAZY) -> Dict:
+    """Best of `repeat` runs (the first pays for cold .pyc and disk caches)."""
+    modules = top_level_imports(app)
+    roots = {m.split(".")[0] for m in modules}
+    best = None
+    for _ in range(repeat):
+        rows = measure(modules)
+        # depth-0 rows also include interpreter startup (site, encodings); keep the app's own
+        top = [r for r in rows if r["depth"] == 0 and r["module"].split(".")[0] in roots]
+        total = sum(r["cumulative_us"] for r in top)
+        if best is None or total < best[0]:
+            best = (total, top, rows)
+    total, top, rows = best
+    loaded = {r["module"] for r in rows}
+    return {
+        "app": app,
+        "total_ms": round(total / 1e3, 1),
+        "imports": {r["module"]: round(r["cumulative_us"] / 1e3, 2) for r in top},
+        "heaviest": [(r["module"], round(r["self_us"] / 1e3, 2))
+                     for r in sorted(rows, key=lambda r: -r["self_us"])[:15]],
+        "eager": [m for m in watch if m in loaded],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Measure an app's import-time cost.")
+    ap.add_argument("--app", default="shuffle.py")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--budget-ms", type=float, default=0, help="fail if total import time exceeds this")
+    ap.add_argument("--forbid", default="", help="comma-separated modules that must not load at import")
+    ap.add_argument("--json", default=None, help="write the report here")
+    args = ap.parse_args(argv)
+
+    forbid = [m for m in args.forbid.split(",") if m]
+    res = report(args.app, args.repeat, watch=tuple(dict.fromkeys(LAZY + tuple(forbid))))
+    print(f"{res['app']}: {res['total_ms']:.1f} ms of imports")
+    for name, ms in sorted(res["imports"].items(), key=lambda kv: -kv[1]):
+        print(f"  {name:24} {ms:8.2f} ms")
+    print("heaviest modules (self):")
+    for name, ms in res["heaviest"]:
+        print(f"  {name:40} {ms:8.2f} ms")
+    print("eagerly loaded:", ", ".join(res["eager"]) or "none of the lazy modules")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=1)
+
+    failures = []
+    if args.budget_ms and res["total_ms"] > args.budget_ms:
+        failures.append(f"import time {res['total_ms']:.1f} ms > budget {args.budget_ms:g} ms")
+    for mod in forbid:
+        if mod in res["eager"]:
+            failures.append(f"{mod} is imported at startup")
+    for line in failures:
+        print("OVER BUDGET", line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
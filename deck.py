@@ -0,0 +1,215 @@
+# deck.py
+# Deck definitions (decks/*.json or *.toml) compiled once per process into an
+# immutable, validated index: card ID -> resolved asset path, size and hash,
+# plus per-phase pool, deal count and flip limit. Sessions deal from the index
+# without touching the filesystem; the deck file and its assets are re-checked
+# by mtime and size at most every RELOAD_INTERVAL seconds and the deck is
+# recompiled (assets re-hashed) when any of them changes, so the hashes in the
+# index always name the images currently on disk.
+
+import hashlib, json, os, threading, time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+DEFAULT_DECK = os.environ.get("TTX_DECK", os.path.join("decks", "ttx.json"))
+RELOAD_INTERVAL = 2.0
+
+
+class DeckError(ValueError):
+    """The deck file is malformed or inconsistent."""
+
+
+@dataclass(frozen=True)
+class Asset:
+    path: Optional[str]          # None -> draw a placeholder
+    size: int = 0
+    sha256: str = ""
+    mtime_ns: int = 0
+
+@dataclass(frozen=True)
+class Card:
+    id: str
+    phase: str
+    story: str
+    asset: Asset
+
+@dataclass(frozen=True)
+class Phase:
+    name: str
+    cards: Tuple[str, ...]
+    deal: int
+    flip_limit: Optional[int]    # 0 = unlimited, None = use the sidebar limit
+
+@dataclass(frozen=True)
+class DeckIndex:
+    name: str
+    path: str
+    mtime_ns: int
+    version: str                 # hash of the deck file and every asset it references
+    back: Asset
+    phases: Mapping[str, Phase]  # in deck order
+    cards: Mapping[str, Card]
+
+    def assets_changed(self) -> bool:
+        """True if an asset file was edited or removed since the index was compiled."""
+        for a in [self.back] + [c.asset for c in self.cards.values()]:
+            if a.path is None:
+                continue
+            try:
+                st_ = os.stat(a.path)
+            except OSError:
+                return True
+            if (st_.st_mtime_ns, st_.st_size) != (a.mtime_ns, a.size):
+                return True
+        return False
+
+    @property
+    def pools(self) -> Mapping[str, Tuple[str, ...]]:
+        return MappingProxyType({n: p.cards for n, p in self.phases.items()})
+
+    @property
+    def deal_counts(self) -> Mapping[str, int]:
+        return MappingProxyType({n: p.deal for n, p in self.phases.items()})
+
+    def story(self, card_id: str) -> str:
+        card = self.cards.get(card_id)
+        return card.story if card else ""
+
+
+def _read(path: str) -> Dict:
+    with open(path, "rb") as f:
+        raw = f.read()
+    if path.endswith(".toml"):
+        import tomllib
+        return tomllib.loads(raw.decode("utf-8"))
+    return json.loads(raw)
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _asset(asset_dir: str, filename: Optional[str]) -> Asset:
+    if not filename:
+        return Asset(None)
+    path = os.path.normpath(os.path.join(asset_dir, filename))
+    try:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            st_ = os.fstat(f.fileno())
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except OSError:
+        return Asset(None)  # missing front -> placeholder, as before
+    return Asset(os.path.relpath(path), st_.st_size, h.hexdigest(), st_.st_mtime_ns)
+
+def compile_deck(path: str) -> DeckIndex:
+    """Parse, validate and resolve a deck file. Raises DeckError on bad input."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        spec = _read(path)
+    except (OSError, ValueError) as e:
+        raise DeckError(f"{path}: {e}") from e
+    try:
+        return _compile(path, mtime_ns, spec)
+    except (TypeError, ValueError, AttributeError) as e:
+        if isinstance(e, DeckError):
+            raise
+        raise DeckError(f"{path}: {e}") from e  # wrong types, e.g. "deal": "three"
+
+def _compile(path: str, mtime_ns: int, spec: Dict) -> DeckIndex:
+    if not isinstance(spec, dict):
+        raise DeckError(f"{path}: top level must be a table/object")
+    asset_dir = os.path.join(os.path.dirname(path), spec.get("asset_dir", "."))
+
+    raw_cards = spec.get("cards") or {}
+    raw_phases = spec.get("phases") or []
+    if not isinstance(raw_cards, dict) or not all(isinstance(c, dict) for c in raw_cards.values()):
+        raise DeckError(f"{path}: 'cards' must map card IDs to objects")
+    if not isinstance(raw_phases, list) or not all(isinstance(p, dict) for p in raw_phases):
+        raise DeckError(f"{path}: 'phases' must be a list of objects")
+    if not raw_phases:
+        raise DeckError(f"{path}: no phases")
+
+    phases: Dict[str, Phase] = {}
+    card_phase: Dict[str, str] = {}
+    for p in raw_phases:
+        name = p.get("name")
+        ids = tuple(p.get("cards") or ())
+        if not name or name in phases:
+            raise DeckError(f"{path}: phase name missing or duplicated: {name!r}")
+        if not ids:
+            raise DeckError(f"{path}: phase {name!r} has no cards")
+        for cid in ids:
+            if cid not in raw_cards:
+                raise DeckError(f"{path}: phase {name!r} references unknown card {cid!r}")
+            if cid in card_phase:
+                raise DeckError(f"{path}: card {cid!r} is in both {card_phase[cid]!r} and {name!r}")
+            card_phase[cid] = name
+        deal_n = p.get("deal", len(ids))
+        limit = p.get("flip_limit")
+        if not _is_int(deal_n) or not (limit is None or _is_int(limit)):
+            raise DeckError(f"{path}: phase {name!r}: deal and flip_limit must be integers")
+        if not 0 < deal_n <= len(ids):
+            raise DeckError(f"{path}: phase {name!r} deals {deal_n} of {len(ids)} cards")
+        if limit is not None and limit < 0:
+            raise DeckError(f"{path}: phase {name!r} has a negative flip limit")
+        phases[name] = Phase(name, ids, deal_n, limit)
+
+    cards = {}
+    for cid, c in raw_cards.items():
+        if cid not in card_phase:
+            raise DeckError(f"{path}: card {cid!r} is not in any phase")
+        cards[cid] = Card(cid, card_phase[cid], c.get("story", ""), _asset(asset_dir, c.get("asset")))
+    back = _asset(asset_dir, spec.get("back"))
+
+    version = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8"))
+    for a in [back] + [c.asset for c in cards.values()]:
+        version.update(a.sha256.encode("ascii"))
+    return DeckIndex(
+        name=spec.get("name", os.path.splitext(os.path.basename(path))[0]),
+        path=path,
+        mtime_ns=mtime_ns,
+        version=version.hexdigest()[:16],
+        back=back,
+        phases=MappingProxyType(phases),
+        cards=MappingProxyType(cards),
+    )
+
+
+class DeckLoader:
+    """Process-wide holder of the compiled deck, hot-reloaded when it or an asset changes.
+
+    A broken edit keeps the last good index (the error is kept in `last_error`).
+    """
+
+    def __init__(self, path: str = DEFAULT_DECK, interval: float = RELOAD_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._index = compile_deck(path)
+        self._checked = time.monotonic()
+        self._failed_mtime = -1
+        self.last_error: Optional[str] = None
+
+    def get(self) -> DeckIndex:
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return self._index
+        with self._lock:
+            if now - self._checked >= self.interval:
+                self._checked = now
+                try:
+                    mtime_ns = os.stat(self.path).st_mtime_ns
+                    if mtime_ns != self._index.mtime_ns:
+                        stale = mtime_ns != self._failed_mtime
+                    else:
+                        stale = self._index.assets_changed()  # an image edited in place
+                    if stale:
+                        self._index = compile_deck(self.path)
+                        self.last_error = None
+                except OSError as e:
+                    self.last_error = str(e)
+                except DeckError as e:
+                    self._failed_mtime = mtime_ns  # don't recompile the same broken file
+                    self.last_error = str(e)
+        return self._index
@@ -0,0 +1,250 @@
+# export_deck.py
+# Print export for physical backup decks and handouts.
+# Renders every card of a deck (real fronts, or the placeholder design when an
+# asset is missing) plus the back at print resolution with bleed, lays them out
+# on crop-marked page sheets, and writes one PDF. Cards and sheets are rendered
+# in a process pool and written to disk as they finish; the PDF is assembled
+# one page at a time. Re-exports skip every card and sheet whose content hash
+# (source hash + print settings) is unchanged.
+#
+#   python export_deck.py                          # decks/ttx.json -> export/
+#   python export_deck.py --page letter --dpi 600 --backs --jobs 4
+
+import argparse, hashlib, json, math, os, sys, time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from deck import DEFAULT_DECK, DeckIndex, compile_deck
+from placeholders import STYLE_VERSION
+
+EXPORT_VERSION = 2   # bump when the rendering below changes
+OUT_DIR = "export"
+MANIFEST_NAME = "export.json"
+PDF_NAME = "deck.pdf"
+BACK = "back"
+
+DPI = 300
+TRIM_MM = (63.0, 88.0)   # poker size, same 5:7-ish portrait as the board slots
+BLEED_MM = 2.0           # keeps 3x3 cards per A4 page with the margin below
+MARGIN_MM = 4.0
+MARK_MM = 3.0            # crop-mark length, drawn in the page margin
+PAGES_MM = {"a4": (210.0, 297.0), "letter": (215.9, 279.4)}
+BOARD_W = 288            # placeholder design width the font and border sizes were tuned for
+
+
+class PrintSpec(NamedTuple):
+    dpi: int
+    trim: Tuple[int, int]    # px
+    bleed: int               # px per side
+    page: Tuple[int, int]    # px
+    margin: int              # px
+
+    @property
+    def cell(self) -> Tuple[int, int]:
+        return self.trim[0] + 2 * self.bleed, self.trim[1] + 2 * self.bleed
+
+    @property
+    def grid(self) -> Tuple[int, int]:
+        (cw, ch), (pw, ph) = self.cell, self.page
+        return max((pw - 2 * self.margin) // cw, 1), max((ph - 2 * self.margin) // ch, 1)
+
+
+def mm_px(mm: float, dpi: int) -> int:
+    return round(mm / 25.4 * dpi)
+
+def print_spec(dpi: int = DPI, page: str = "a4", bleed_mm: float = BLEED_MM,
+               trim_mm: Tuple[float, float] = TRIM_MM, margin_mm: float = MARGIN_MM) -> PrintSpec:
+    return PrintSpec(dpi, (mm_px(trim_mm[0], dpi), mm_px(trim_mm[1], dpi)), mm_px(bleed_mm, dpi),
+                     tuple(mm_px(v, dpi) for v in PAGES_MM[page]), mm_px(margin_mm, dpi))
+
+def _hash(*parts) -> str:
+    return hashlib.sha256(json.dumps([EXPORT_VERSION, *parts]).encode("utf-8")).hexdigest()
+
+def card_jobs(deck: DeckIndex) -> List[Tuple[str, Optional[str], str, str]]:
+    """(name, asset path or None, label, story) for the back and every card in phase order."""
+    jobs = [(BACK, deck.back.path, "", "")]
+    for phase in deck.phases.values():
+        for cid in phase.cards:
+            card = deck.cards[cid]
+            jobs.append((cid, card.asset.path, cid, card.story))
+    return jobs
+
+def card_hash(deck: DeckIndex, name: str, story: str, spec: PrintSpec) -> str:
+    if name == BACK:
+        source = deck.back.sha256 or "placeholder"
+    else:
+        source = deck.cards[name].asset.sha256 or f"placeholder:{story}"
+    return _hash(name, source, STYLE_VERSION, spec)
+
+
+# ----- workers (child processes) -----
+def _render_card(name: str, path: Optional[str], label: str, story: str, spec: PrintSpec,
+                 out_path: str) -> int:
+    """Render one card at trim size, extend it into the bleed and write a PNG."""
+    from PIL import Image, ImageOps
+    from placeholders import draw_back, draw_front
+
+    tw, th = spec.trim
+    scale = tw / BOARD_W   # fonts and borders keep their on-screen proportions
+    border, frame = round(8 * scale), round(3 * scale)
+    iw, ih = tw - 2 * (border + frame), th - 2 * (border + frame)   # the drawn border goes around
+    if path:
+        with Image.open(path) as src:
+            img = ImageOps.fit(src.convert("RGB"), (tw, th), Image.LANCZOS)
+    elif name == BACK:
+        img = draw_back(iw, ih, border=border, frame=frame)
+    else:
+        img = draw_front(label, story, iw, ih, label_size=round(68 * scale),
+                         subtitle_size=round(24 * scale), border=border, frame=frame)
+    img = img.convert("RGB").resize((tw, th), Image.LANCZOS) if img.size != (tw, th) else img.convert("RGB")
+    # bleed: the card stretched to the full cell underneath, the card itself on top
+    cell = img.resize(spec.cell, Image.LANCZOS)
+    cell.paste(img, (spec.bleed, spec.bleed))
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    cell.save(tmp, format="PNG", dpi=(spec.dpi, spec.dpi))
+    os.replace(tmp, out_path)
+    return os.path.getsize(out_path)
+
+def _render_sheet(files: List[str], spec: PrintSpec, out_path: str) -> int:
+    """Lay out card PNGs on one page with crop marks at every trim line."""
+    from PIL import Image, ImageDraw
+
+    (cw, ch), (cols, rows) = spec.cell, spec.grid
+    pw, ph = spec.page
+    x0 = (pw - cols * cw) // 2
+    y0 = (ph - rows * ch) // 2
+    page = Image.new("RGB", (pw, ph), "white")
+    for k, f in enumerate(files):
+        with Image.open(f) as card:
+            page.paste(card, (x0 + (k % cols) * cw, y0 + (k // cols) * ch))
+    d = ImageDraw.Draw(page)
+    mark, gap, w = mm_px(MARK_MM, spec.dpi), spec.bleed, max(spec.dpi // 150, 1)
+    used_rows = math.ceil(len(files) / cols)
+    for c in range(cols):
+        for x in (x0 + c * cw + spec.bleed, x0 + (c + 1) * cw - spec.bleed):
+            d.line([(x, y0 - gap - mark), (x, y0 - gap)], fill="black", width=w)
+            yb = y0 + used_rows * ch + gap
+            d.line([(x, yb), (x, yb + mark)], fill="black", width=w)
+    for r in range(used_rows):
+        for y in (y0 + r * ch + spec.bleed, y0 + (r + 1) * ch - spec.bleed):
+            d.line([(x0 - gap - mark, y), (x0 - gap, y)], fill="black", width=w)
+            xr = x0 + cols * cw + gap
+            d.line([(xr, y), (xr + mark, y)], fill="black", width=w)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    page.save(tmp, format="PNG", dpi=(spec.dpi, spec.dpi))
+    os.replace(tmp, out_path)
+    return os.path.getsize(out_path)
+
+
+# ----- driver -----
+def load_manifest(out_dir: str = OUT_DIR) -> Dict:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": EXPORT_VERSION, "cards": {}, "sheets": []}
+    if manifest.get("version") != EXPORT_VERSION:
+        return {"version": EXPORT_VERSION, "cards": {}, "sheets": []}
+    return manifest
+
+def write_pdf(pages: List[str], spec: PrintSpec, out_path: str):
+    """Append pages to the PDF one at a time; only one page is decoded at once."""
+    from PIL import Image
+
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    for i, page in enumerate(pages):
+        with Image.open(page) as im:
+            im.save(tmp, format="PDF", resolution=spec.dpi, append=i > 0)
+    os.replace(tmp, out_path)
+
+def export_deck(deck_path: str = DEFAULT_DECK, out_dir: str = OUT_DIR, dpi: int = DPI, page: str = "a4",
+                bleed_mm: float = BLEED_MM, backs: bool = False, jobs: Optional[int] = None,
+                force: bool = False) -> Dict:
+    """Render cards, sheets and the PDF for a deck into `out_dir`. Returns the manifest."""
+    deck = compile_deck(deck_path)
+    spec = print_spec(dpi, page, bleed_mm)
+    old = {} if force else load_manifest(out_dir)
+    os.makedirs(os.path.join(out_dir, "cards"), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, "sheets"), exist_ok=True)
+
+    def fresh(entry: Optional[Dict], h: str) -> bool:
+        return bool(entry) and entry["hash"] == h and os.path.exists(os.path.join(out_dir, entry["file"]))
+
+    from concurrent.futures import ProcessPoolExecutor
+    built: List[str] = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        cards, futures = {}, {}
+        for name, path, label, story in card_jobs(deck):
+            h = card_hash(deck, name, story, spec)
+            entry = {"file": f"cards/{name}.{h[:12]}.png", "hash": h}
+            cards[name] = entry
+            if not fresh(old.get("cards", {}).get(name), h):
+                futures[name] = pool.submit(_render_card, name, path, label, story, spec,
+                                            os.path.join(out_dir, entry["file"]))
+        for name, fut in futures.items():
+            fut.result()
+            built.append(cards[name]["file"])
+
+        per_page = spec.grid[0] * spec.grid[1]
+        fronts = [n for n in cards if n != BACK]
+        groups = [fronts[i:i + per_page] for i in range(0, len(fronts), per_page)]
+        if backs:
+            groups.append([BACK] * per_page)
+        old_sheets = {s["hash"]: s for s in old.get("sheets", [])}
+        sheets, futures = [], []
+        for i, group in enumerate(groups):
+            h = _hash([cards[n]["hash"] for n in group], spec)
+            entry = {"file": f"sheets/sheet{i + 1}.{h[:12]}.png", "hash": h, "cards": group}
+            sheets.append(entry)
+            if fresh(old_sheets.get(h), h):
+                entry["file"] = old_sheets[h]["file"]
+            else:
+                files = [os.path.join(out_dir, cards[n]["file"]) for n in group]
+                futures.append(pool.submit(_render_sheet, files, spec, os.path.join(out_dir, entry["file"])))
+                built.append(entry["file"])
+        for fut in futures:
+            fut.result()
+
+    # duplex order: every front sheet followed by the back sheet
+    order = [s["file"] for s in sheets if s["cards"][0] != BACK or not backs]
+    if backs:
+        order = [f for front in order for f in (front, sheets[-1]["file"])]
+    pdf_hash = _hash([s["hash"] for s in sheets], order)
+    pdf = {"file": PDF_NAME, "hash": pdf_hash}
+    if not fresh(old.get("pdf"), pdf_hash):
+        write_pdf([os.path.join(out_dir, f) for f in order], spec, os.path.join(out_dir, PDF_NAME))
+        built.append(PDF_NAME)
+
+    manifest = {"version": EXPORT_VERSION, "deck": deck.name, "deck_version": deck.version,
+                "spec": spec._asdict(), "cards": cards, "sheets": sheets, "pdf": pdf}
+    tmp = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+    manifest["built"] = built
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Export a deck to print-ready card images, sheets and a PDF.")
+    ap.add_argument("--deck", default=DEFAULT_DECK)
+    ap.add_argument("--out", default=OUT_DIR)
+    ap.add_argument("--dpi", type=int, default=DPI)
+    ap.add_argument("--page", choices=sorted(PAGES_MM), default="a4")
+    ap.add_argument("--bleed-mm", type=float, default=BLEED_MM)
+    ap.add_argument("--backs", action="store_true", help="add a back sheet after every front sheet (duplex)")
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="re-render everything")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    manifest = export_deck(args.deck, args.out, dpi=args.dpi, page=args.page, bleed_mm=args.bleed_mm,
+                           backs=args.backs, jobs=args.jobs, force=args.force)
+    cols, rows = PrintSpec(**manifest["spec"]).grid
+    print(f"{manifest['deck']}: {len(manifest['cards'])} cards, {len(manifest['sheets'])} sheet(s) "
+          f"of {cols}x{rows} -> {os.path.join(args.out, PDF_NAME)}")
+    print(f"{len(manifest['built'])} file(s) written, the rest unchanged, {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# metrics.py
+# Low-overhead, process-wide counters and timers for the hot paths in shuffle.py.
+# Exported as Prometheus text to a file (TTX_METRICS_FILE) and/or a local HTTP
+# endpoint (TTX_METRICS_PORT); also read by the sidebar admin panel.
+# Disable entirely with TTX_METRICS=0.
+
+import functools, os, threading, time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+ENABLED = os.environ.get("TTX_METRICS", "1") != "0"
+PREFIX = "ttx_"
+SESSION_IDLE = 300.0  # seconds without a rerun (full or fragment) before a session stops counting as active
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.timers: Dict[str, List[float]] = {}       # name -> [count, total_s, max_s]
+        self._sessions: Dict[str, List[float]] = {}    # session -> [last_seen, state_bytes]
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+
+    # ----- recording -----
+    def inc(self, name: str, value: float = 1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        if not ENABLED:
+            return
+        with self._lock:
+            t = self.timers.get(name)
+            if t is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                t[0] += 1
+                t[1] += seconds
+                if seconds > t[2]:
+                    t[2] = seconds
+
+    @contextmanager
+    def timed(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def timer(self, name: str):
+        """Decorator form of `timed`."""
+        def wrap(func):
+            @functools.wraps(func)
+            def inner(*args, **kwargs):
+                with self.timed(name):
+                    return func(*args, **kwargs)
+            return inner
+        return wrap
+
+    def session(self, session_id: str, state_bytes: int):
+        """Heartbeat from a session at the end of a (full or fragment) rerun."""
+        if not ENABLED:
+            return
+        with self._lock:
+            self._sessions[session_id] = [time.monotonic(), state_bytes]
+
+    def touch(self, session_id: str):
+        """Heartbeat without a new state size (e.g. from a polling fragment)."""
+        if not ENABLED:
+            return
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self._sessions[session_id] = [time.monotonic(), 0]
+            else:
+                entry[0] = time.monotonic()
+
+    def add_collector(self, collect: Callable[[], Dict[str, float]]):
+        """`collect()` is called at export time and returns gauges (e.g. cache stats)."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    # ----- reading -----
+    def gauges(self) -> Dict[str, float]:
+        now = time.monotonic()
+        with self._lock:
+            for sid in [s for s, (seen, _) in self._sessions.items() if now - seen > SESSION_IDLE]:
+                del self._sessions[sid]
+            sizes = [b for _, b in self._sessions.values()]
+            collectors = list(self._collectors)
+        out = {
+            "active_sessions": len(sizes),
+            "session_state_bytes_total": sum(sizes),
+            "session_state_bytes_max": max(sizes, default=0),
+        }
+        for collect in collectors:
+            try:
+                out.update(collect())
+            except Exception:
+                pass  # a broken collector must not break the export
+        return out
+
+    def prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = dict(self.counters)
+            timers = {k: list(v) for k, v in self.timers.items()}
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {PREFIX}{name}_total counter")
+            lines.append(f"{PREFIX}{name}_total {value:g}")
+        for name, (count, total, peak) in sorted(timers.items()):
+            lines.append(f"# TYPE {PREFIX}{name}_seconds summary")
+            lines.append(f"{PREFIX}{name}_seconds_count {count:g}")
+            lines.append(f"{PREFIX}{name}_seconds_sum {total:.6f}")
+            lines.append(f"# TYPE {PREFIX}{name}_seconds_max gauge")
+            lines.append(f"{PREFIX}{name}_seconds_max {peak:.6f}")
+        for name, value in sorted(self.gauges().items()):
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(f"{PREFIX}{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    # ----- export -----
+    def write_file(self, path: str):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def start_file_writer(self, path: str, interval: float = 10.0) -> threading.Thread:
+        def loop():
+            while True:
+                try:
+                    self.write_file(path)
+                except OSError:
+                    pass
+                time.sleep(interval)
+        t = threading.Thread(target=loop, name="metrics-writer", daemon=True)
+        t.start()
+        return t
+
+    def start_server(self, host: str = "127.0.0.1", port: int = 9108) -> "ThreadingHTTPServer":
+        """Serve GET /metrics on a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+metrics = Metrics()
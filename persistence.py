@@ -0,0 +1,196 @@
+# persistence.py
+# Durable room state: an append-only SQLite event log (flip, shuffle, reset,
+# assign, zoom) plus one compact snapshot per room, rewritten every
+# SNAPSHOT_EVERY changes. Writes are queued from the request path and committed
+# in batches by a background thread. Recovery reads the last snapshot and
+# replays only the events after it (see Room.replay), so a refresh or a server
+# restart rejoins the same board without re-dealing.
+# A room is written only once something happens in it (its first change is
+# stored as a snapshot), events already covered by a snapshot are compacted
+# away, and rooms idle for longer than `retention` are pruned.
+
+import atexit, json, os, queue, sqlite3, threading, time
+from contextlib import closing
+from typing import Dict, List, Optional, Set, Tuple
+
+from rooms import Change, Room
+
+SNAPSHOT_EVERY = 50   # changes per room between snapshots
+BATCH_MAX = 500       # rows per transaction
+FLUSH_INTERVAL = 0.05 # seconds the writer waits to fill a batch
+PRUNE_INTERVAL = 600.0  # seconds between compaction/pruning passes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    room    TEXT    NOT NULL,
+    version INTEGER NOT NULL,
+    kind    TEXT    NOT NULL,
+    phase   TEXT,
+    card    TEXT,
+    data    TEXT,
+    ts      REAL    NOT NULL,
+    PRIMARY KEY (room, version)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    room    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    state   TEXT    NOT NULL,
+    ts      REAL    NOT NULL
+);
+"""
+
+_STOP = object()
+
+
+class EventLog:
+    """SQLite-backed journal for RoomStore. One instance per process."""
+
+    def __init__(self, path: str, snapshot_every: int = SNAPSHOT_EVERY, retention: float = 6 * 3600):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.retention = retention
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._cond = threading.Condition()
+        self._queued: Dict[str, int] = {}   # room -> rows not yet committed
+        self._stored: Set[str] = set()      # rooms with a snapshot in the database
+        self.written = 0
+        self.snapshots = 0
+        self.pruned = 0
+        self.last_error: Optional[str] = None
+        self._thread = threading.Thread(target=self._writer, name="event-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ----- request path: enqueue only -----
+    def record(self, room: Room, change: Change, data: Optional[Dict]):
+        """Journal hook for Room (called under the room lock)."""
+        with self._cond:
+            first = room.room_id not in self._stored
+            self._stored.add(room.room_id)
+        if first or change.version % self.snapshot_every == 0:
+            self.snapshot(room)  # the first change: deal and change in one row
+            return
+        self._put("event", room.room_id, (room.room_id, change.version, change.kind, change.phase,
+                                          change.card_id, json.dumps(data) if data is not None else None,
+                                          time.time()))
+
+    def snapshot(self, room: Room):
+        state = room.state()
+        self._put("snapshot", room.room_id, (room.room_id, state["version"], json.dumps(state), time.time()))
+
+    def _put(self, kind: str, room_id: str, row: Tuple):
+        with self._cond:
+            self._queued[room_id] = self._queued.get(room_id, 0) + 1
+        self._queue.put((kind, row))
+
+    # ----- background writer -----
+    def _writer(self):
+        db = self._connect()
+        stop = False
+        next_prune = time.monotonic()
+        while not stop:
+            if time.monotonic() >= next_prune:
+                self._prune(db)
+                next_prune = time.monotonic() + PRUNE_INTERVAL
+            try:
+                items = [self._queue.get(timeout=PRUNE_INTERVAL)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(items) < BATCH_MAX:
+                try:
+                    items.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in items)
+            rows = [item for item in items if item is not _STOP]
+            events = [row for kind, row in rows if kind == "event"]
+            snaps = [row for kind, row in rows if kind == "snapshot"]
+            try:
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", events)
+                    db.executemany(
+                        "INSERT INTO snapshots VALUES (?, ?, ?, ?) ON CONFLICT(room) DO UPDATE SET "
+                        "version = excluded.version, state = excluded.state, ts = excluded.ts "
+                        "WHERE excluded.version >= snapshots.version", snaps)
+                self.written += len(events)
+                self.snapshots += len(snaps)
+            except sqlite3.Error as e:
+                self.last_error = str(e)  # keep serving; the in-memory room is still authoritative
+            finally:
+                with self._cond:
+                    for _, row in rows:
+                        left = self._queued.get(row[0], 0) - 1
+                        if left > 0:
+                            self._queued[row[0]] = left
+                        else:
+                            self._queued.pop(row[0], None)
+                    self._cond.notify_all()
+                for _ in items:
+                    self._queue.task_done()
+        db.close()
+
+    def _prune(self, db: sqlite3.Connection):
+        """Drop events a snapshot already covers, and rooms idle past `retention`."""
+        cutoff = time.time() - self.retention
+        try:
+            with db:
+                stale = [r for (r,) in db.execute(
+                    "SELECT room FROM snapshots s WHERE ts < ? AND NOT EXISTS "
+                    "(SELECT 1 FROM events e WHERE e.room = s.room AND e.ts >= ?)", (cutoff, cutoff))]
+                with self._cond:
+                    stale = [r for r in stale if r not in self._queued]
+                    self._stored.difference_update(stale)  # a later change re-snapshots the room
+                db.executemany("DELETE FROM snapshots WHERE room = ?", [(r,) for r in stale])
+                db.executemany("DELETE FROM events WHERE room = ?", [(r,) for r in stale])
+                db.execute("DELETE FROM events WHERE version <= "
+                           "(SELECT s.version FROM snapshots s WHERE s.room = events.room)")
+            self.pruned += len(stale)
+        except sqlite3.Error as e:
+            self.last_error = str(e)
+
+    def flush(self, room_id: Optional[str] = None, timeout: float = 5.0):
+        """Block until everything queued so far (for `room_id` only, if given) is committed."""
+        if room_id is None:
+            self._queue.join()
+            return
+        with self._cond:
+            self._cond.wait_for(lambda: room_id not in self._queued, timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+
+    # ----- recovery -----
+    def load(self, room_id: str) -> Optional[Room]:
+        """Rebuild a room from its last snapshot plus later events; None if unknown."""
+        self.flush(room_id)
+        with closing(self._connect()) as db:
+            snap = db.execute("SELECT version, state FROM snapshots WHERE room = ?", (room_id,)).fetchone()
+            if snap is None:
+                return None
+            events: List[Tuple] = db.execute(
+                "SELECT version, kind, phase, card, data FROM events WHERE room = ? AND version > ? "
+                "ORDER BY version", (room_id, snap[0])).fetchall()
+        with self._cond:
+            self._stored.add(room_id)
+        room = Room.from_state(room_id, json.loads(snap[1]))
+        for version, kind, phase, card, data in events:
+            if version != room.version + 1:
+                break  # gap in the log: stop at the last consistent state
+            room.replay(kind, phase, card, json.loads(data) if data else None)
+        return room
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "snapshots": self.snapshots,
+                "pruned": self.pruned}
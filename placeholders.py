@@ -0,0 +1,131 @@
+# placeholders.py
+# Shared fallback-card renderer for shuffle.py and card_backs.py.
+# Fonts are cached by (path, size); rendered PNG bytes by
+# (kind, label, subtitle, width, height, STYLE_VERSION) in a bounded LRU with an
+# optional on-disk tier, so a placeholder is drawn once per node.
+
+import functools, hashlib, io, os, textwrap, threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+STYLE_VERSION = 1  # bump when the drawing code below changes
+FONT_PATH = "DejaVuSans-Bold.ttf"
+CACHE_DIR = os.environ.get("TTX_PLACEHOLDER_CACHE", os.path.join(".cache", "placeholders"))  # "" = memory only
+MAX_ENTRIES = int(os.environ.get("TTX_PLACEHOLDER_CACHE_ENTRIES", "256"))
+
+NAVY = (16, 34, 64); WHITE = (248, 251, 255); STRIPE = (208, 213, 221); LIGHT = (236, 240, 248)
+
+
+@functools.lru_cache(maxsize=32)
+def get_font(size: int, path: str = FONT_PATH):
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(path, size)
+    except Exception:
+        return ImageFont.load_default()
+
+def draw_back(w: int, h: int, border: int = 8, frame: int = 3):
+    from PIL import Image, ImageDraw, ImageOps
+    img = Image.new("RGB", (w, h), NAVY)
+    d = ImageDraw.Draw(img)
+    for x in range(-h, w + h, 36):
+        d.line([(x, 0), (x + h, h)], fill=(255, 255, 255, 32), width=2)
+    d.text((w // 2, h // 2 - 40), "🦉", anchor="mm", fill=WHITE)
+    img = ImageOps.expand(img, border=border, fill=(240, 244, 252))
+    img = ImageOps.expand(img, border=frame, fill=(220, 226, 236))
+    return img
+
+def draw_front(label: str, subtitle: str, w: int, h: int, label_size: int = 68, subtitle_size: int = 24,
+               border: int = 8, frame: int = 3):
+    from PIL import Image, ImageDraw, ImageOps
+    img = Image.new("RGB", (w, h), NAVY)
+    d = ImageDraw.Draw(img)
+    d.rectangle([0, int(h * 0.16), w, int(h * 0.19)], fill=STRIPE)
+    d.rectangle([0, int(h * 0.72), w, int(h * 0.75)], fill=STRIPE)
+    d.text((w // 2, int(h * 0.30)), label, anchor="mm", fill=LIGHT, font=get_font(label_size))
+    wrapped = textwrap.fill(subtitle, width=22)
+    d.multiline_text((w // 2, int(h * 0.55)), wrapped, anchor="mm",
+                     fill=LIGHT, font=get_font(subtitle_size), align="center")
+    img = ImageOps.expand(img, border=border, fill=(240, 244, 252))
+    img = ImageOps.expand(img, border=frame, fill=(220, 226, 236))
+    return img
+
+def pil_to_png(img) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class RenderCache:
+    """LRU of rendered PNG bytes, backed by `cache_dir` when set."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, cache_dir: Optional[str] = CACHE_DIR):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir or None
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, render: Callable[[], bytes]) -> bytes:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return data
+        path = self._disk_path(key)
+        data = _read(path) if path else None
+        if data is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            data = render()
+            if path:
+                _write(path, data)
+        with self._lock:
+            self._mem[key] = data
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "entries": len(self._mem)}
+
+    def _disk_path(self, key: Hashable) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:24]
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _write(path: str, data: bytes):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # disk tier is best-effort
+
+
+render_cache = RenderCache()
+
+def back_png(w: int, h: int) -> bytes:
+    return render_cache.get(("back", w, h, STYLE_VERSION), lambda: pil_to_png(draw_back(w, h)))
+
+def front_png(label: str, subtitle: str, w: int, h: int, label_size: int = 68) -> bytes:
+    key = ("front", label, subtitle, w, h, label_size, STYLE_VERSION)
+    return render_cache.get(key, lambda: pil_to_png(draw_front(label, subtitle, w, h, label_size)))
@@ -0,0 +1,269 @@
+# rooms.py
+# Shared game state for multi-room drills.
+# One compact Room per drill (card IDs, flipped bitmask, owners, turn, score),
+# held in a process-wide RoomStore. Every mutation is an atomic room operation
+# under the room's own lock; asset data never lives here, only card IDs.
+# Every operation bumps the room version and appends a Change to a short log,
+# so viewers can pull only what happened since the version they last drew.
+# A room can also report each change to a journal (persistence.py) with enough
+# data to replay it, and be rebuilt from a state dict plus replayed events.
+
+import random, threading, time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+NO_OWNER = -1
+LOG_SIZE = 256  # changes kept per room; older viewers resync in full
+
+
+class Change(NamedTuple):
+    version: int
+    kind: str                     # "flip" | "shuffle" | "reset" | "assign" | "zoom"
+    phase: Optional[str] = None
+    card_id: Optional[str] = None
+
+
+Journal = Callable[["Room", Change, Optional[Dict]], None]
+
+
+def effective_limit(phase_limit: Optional[int], enforce: bool, global_limit: int) -> int:
+    """Flip limit for a phase; 0 = unlimited. Phase rules win when 'enforce' is on."""
+    if not enforce:
+        return 0
+    return phase_limit if phase_limit is not None else (global_limit or 0)
+
+def deal(phases: Dict[str, Sequence[str]], deal_count: Dict[str, int],
+         rng: Optional[random.Random] = None) -> Dict[str, "PhaseState"]:
+    """Shuffle each phase pool and deal its first `deal_count[phase]` cards."""
+    rng = rng or random
+    dealt = {}
+    for ph, ids in phases.items():
+        pool = list(ids)
+        rng.shuffle(pool)
+        n = deal_count.get(ph, len(pool))
+        dealt[ph] = PhaseState(cards=pool[:n], owners=[NO_OWNER] * min(n, len(pool)))
+    return dealt
+
+
+@dataclass(slots=True)
+class PhaseState:
+    cards: List[str]                 # dealt card IDs, in display order
+    owners: List[int]                # team index per position, NO_OWNER if face down
+    flipped: int = 0                 # bit i set = position i is face up
+    version: int = 0
+
+    def is_flipped(self, idx: int) -> bool:
+        return bool(self.flipped >> idx & 1)
+
+    def picked(self) -> int:
+        return bin(self.flipped).count("1")
+
+
+@dataclass(slots=True)
+class Room:
+    room_id: str
+    phases: Dict[str, PhaseState]
+    score: List[int]
+    turn: int = 0
+    version: int = 0
+    team_phase_map: Optional[Dict[str, List[str]]] = None
+    zoom: Optional[Tuple[str, str]] = None   # last (phase, card id) zoomed in this room
+    log: Deque[Change] = field(default_factory=lambda: deque(maxlen=LOG_SIZE), repr=False)
+    touched: float = field(default_factory=time.monotonic)
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
+    journal: Optional[Journal] = field(default=None, repr=False, compare=False)
+
+    # ----- atomic operations -----
+    def flip(self, phase: str, card_id: str, limit: int = 0) -> bool:
+        """Flip `card_id` for the team on turn. False if already up, gone, or over `limit`."""
+        with self.lock:
+            ps = self.phases[phase]
+            try:
+                idx = ps.cards.index(card_id)
+            except ValueError:
+                return False
+            if ps.is_flipped(idx) or (limit and ps.picked() >= limit):
+                return False
+            team = self.turn
+            ps.flipped |= 1 << idx
+            ps.owners[idx] = team
+            self.score[team] += 1
+            self.turn = (team + 1) % len(self.score)
+            self._touch("flip", phase, card_id)
+            return True
+
+    def shuffle_unflipped(self, phase: str, rng: Optional[random.Random] = None):
+        """Keep face-up cards first (in order) and shuffle the rest behind them."""
+        rng = rng or random
+        with self.lock:
+            ps = self.phases[phase]
+            up = [i for i in range(len(ps.cards)) if ps.is_flipped(i)]
+            down = [i for i in range(len(ps.cards)) if not ps.is_flipped(i)]
+            rng.shuffle(down)
+            order = up + down
+            ps.cards = [ps.cards[i] for i in order]
+            ps.owners = [ps.owners[i] for i in order]
+            ps.flipped = (1 << len(up)) - 1
+            self._touch("shuffle", phase)
+
+    def reset(self, phases: Dict[str, PhaseState]):
+        with self.lock:
+            for ph, fresh in phases.items():
+                old = self.phases.get(ph)
+                fresh.version = (old.version + 1) if old else 0
+            self.phases = phases
+            self.score = [0] * len(self.score)
+            self.turn = 0
+            self.zoom = None
+            self._touch("reset")
+
+    def assign_phases(self, teams: Sequence[str], rng: Optional[random.Random] = None):
+        """Randomly split the phases evenly across `teams`."""
+        rng = rng or random
+        with self.lock:
+            names = list(self.phases)
+            rng.shuffle(names)
+            per = len(names) // len(teams)
+            self.team_phase_map = {t: names[i * per:(i + 1) * per] for i, t in enumerate(teams)}
+            self._touch("assign")
+
+    def set_zoom(self, target: Optional[Tuple[str, str]]):
+        """Record a zoom open/close so following screens can mirror it."""
+        with self.lock:
+            if self.zoom != target:
+                self.zoom = target
+                self._touch("zoom", *(target or (None, None)))
+
+    def changes_since(self, version: int) -> Tuple[int, Optional[List[Change]]]:
+        """(current version, changes after `version`); None if the log no longer reaches back."""
+        with self.lock:
+            if version >= self.version:
+                return self.version, []
+            if not self.log or self.log[0].version > version + 1:
+                return self.version, None
+            return self.version, [c for c in self.log if c.version > version]
+
+    def snapshot(self, phase: str) -> Tuple[Tuple[str, ...], int, Tuple[int, ...], int]:
+        """(cards, flipped mask, owners, version) of one phase, read consistently."""
+        with self.lock:
+            ps = self.phases[phase]
+            return tuple(ps.cards), ps.flipped, tuple(ps.owners), ps.version
+
+    # ----- persistence -----
+    def state(self) -> Dict:
+        """JSON-able snapshot of the game state (no log, lock or timestamps)."""
+        with self.lock:
+            return {
+                "phases": {ph: {"cards": ps.cards, "owners": ps.owners, "flipped": ps.flipped,
+                                "version": ps.version} for ph, ps in self.phases.items()},
+                "score": self.score,
+                "turn": self.turn,
+                "version": self.version,
+                "team_phase_map": self.team_phase_map,
+                "zoom": self.zoom,
+            }
+
+    @classmethod
+    def from_state(cls, room_id: str, state: Dict) -> "Room":
+        return cls(
+            room_id=room_id,
+            phases={ph: PhaseState(list(p["cards"]), list(p["owners"]), p["flipped"], p["version"])
+                    for ph, p in state["phases"].items()},
+            score=list(state["score"]),
+            turn=state["turn"],
+            version=state["version"],
+            team_phase_map=state["team_phase_map"],
+            zoom=tuple(state["zoom"]) if state["zoom"] else None,
+        )
+
+    def replay(self, kind: str, phase: Optional[str], card_id: Optional[str], data: Optional[Dict]):
+        """Re-apply a journaled change. Random outcomes come from `data`, not an RNG."""
+        with self.lock:
+            if kind == "flip":
+                self.flip(phase, card_id)
+            elif kind == "shuffle":
+                ps = self.phases[phase]
+                owner = dict(zip(ps.cards, ps.owners))
+                up = ps.picked()
+                ps.cards = list(data["cards"])
+                ps.owners = [owner[c] for c in ps.cards]
+                ps.flipped = (1 << up) - 1
+                self._touch("shuffle", phase)
+            elif kind == "reset":
+                self.reset({ph: PhaseState(list(ids), [NO_OWNER] * len(ids))
+                            for ph, ids in data["phases"].items()})
+            elif kind == "assign":
+                self.team_phase_map = data["team_phase_map"]
+                self._touch("assign")
+            elif kind == "zoom":
+                self.set_zoom((phase, card_id) if phase else None)
+
+    def _journal_data(self, kind: str, phase: Optional[str]) -> Optional[Dict]:
+        if kind == "shuffle":
+            return {"cards": self.phases[phase].cards}
+        if kind == "reset":
+            return {"phases": {ph: ps.cards for ph, ps in self.phases.items()}}
+        if kind == "assign":
+            return {"team_phase_map": self.team_phase_map}
+        return None
+
+    def _touch(self, kind: str, phase: Optional[str] = None, card_id: Optional[str] = None):
+        # caller holds the lock
+        self.version += 1
+        if phase is not None and kind != "zoom":
+            self.phases[phase].version += 1
+        change = Change(self.version, kind, phase, card_id)
+        self.log.append(change)
+        self.touched = time.monotonic()
+        if self.journal is not None:
+            self.journal(self, change, self._journal_data(kind, phase))
+
+
+class RoomStore:
+    """Process-wide registry of rooms. Idle rooms are dropped after `ttl` seconds.
+
+    With an `event_log` (persistence.EventLog), rooms not in memory are
+    recovered from it, and new rooms and every change are written to it.
+    """
+
+    def __init__(self, dealer: Callable[[], Dict[str, PhaseState]], n_teams: int = 2,
+                 ttl: float = 6 * 3600, event_log=None):
+        self.dealer = dealer
+        self.n_teams = n_teams
+        self.ttl = ttl
+        self.event_log = event_log
+        self._lock = threading.Lock()
+        self._rooms: Dict[str, Room] = {}
+
+    def get(self, room_id: str) -> Room:
+        """The room for `room_id`, dealing a fresh one if it does not exist yet."""
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is not None:
+                room.touched = time.monotonic()
+                return room
+            self._expire()
+        # recovery reads the database: keep it outside the store lock
+        loaded = self.event_log.load(room_id) if self.event_log else None
+        with self._lock:
+            room = self._rooms.get(room_id)  # another session may have got there first
+            if room is None:
+                room = loaded or Room(room_id=room_id, phases=self.dealer(), score=[0] * self.n_teams)
+                if self.event_log:
+                    room.journal = self.event_log.record
+                self._rooms[room_id] = room
+            room.touched = time.monotonic()
+            return room
+
+    def reset(self, room_id: str):
+        self.get(room_id).reset(self.dealer())
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def _expire(self):
+        # caller holds the lock
+        cutoff = time.monotonic() - self.ttl
+        for rid in [rid for rid, r in self._rooms.items() if r.touched < cutoff]:
+            del self._rooms[rid]
@@ -2,35 +2,224 @@
 # Phased TTX deck (2×2 grid), flip/zoom, admin controls.
 # Real-drill: Phase1=3 cards; Phases2–4=2 cards each.
 # Supports real images under /assets; falls back to generated placeholders.
+# Startup stays light: imaging (PIL), the asset server, the build manifest
+# reader and SQLite are imported on first use, and one-time setup (CSS,
+# background, deck) is memoized per process. Check with `python coldstart.py`.
 
+import functools
 import os
-import base64, io, random, textwrap
+import pickle
+import time
+import uuid
 from typing import Dict, List, Tuple
 import streamlit as st
-from PIL import Image, ImageDraw, ImageFont, ImageOps
-
+from asset_store import AssetStore, content_id
+from placeholders import back_png, front_png, render_cache
+from rooms import Room, RoomStore, deal, effective_limit
+from deck import DeckIndex, DeckLoader
+from metrics import metrics
+from warmup import Warmup
+
+_rerun_t0 = time.perf_counter()
+_script_done = False  # set at the end of a full run; later calls come from fragment reruns
 st.set_page_config(page_title="TTX Phased Deck", page_icon="🃏", layout="wide")
 
-# ---------- Assets ----------
-ASSET_DIR = "assets"  # holds back.png, card01.png, card02.png, ...
+# Independently rerunnable UI units (Streamlit >= 1.33); plain calls on older versions.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+def fragment(func=None, *, run_every=None):
+    if func is None:
+        return lambda f: fragment(f, run_every=run_every)
+    func = _counted(func, polling=run_every is not None)
+    if _fragment is None:
+        return func
+    return _fragment(func, run_every=run_every)
+
+def _counted(func, polling: bool):
+    """Count a fragment's own reruns, and send the session heartbeat from them."""
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        if not _script_done:
+            return func(*args, **kwargs)  # part of a full run, counted at its end
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.inc("fragment_reruns")
+            if polling:
+                metrics.touch(st.session_state.sid)  # every SYNC_INTERVAL: keep it cheap
+            else:
+                metrics.session(st.session_state.sid, session_state_bytes())
+    return inner
+
+def html(body: str):
+    """st.markdown for raw HTML, counting the bytes sent to the browser."""
+    metrics.inc("fragment_html_bytes" if _script_done else "emitted_html_bytes", len(body))
+    st.markdown(body, unsafe_allow_html=True)
 
-def load_image_b64(filename: str) -> str:
-    """Read an image from assets and return base64 string."""
-    path = os.path.join(ASSET_DIR, filename)
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode("ascii")
+SCORE_REFRESH = os.environ.get("TTX_SCORE_REFRESH", "2s")  # sidebar score poll while phases rerun alone
+SYNC_INTERVAL = os.environ.get("TTX_SYNC_INTERVAL", "500ms")  # how often each screen pulls room changes
+
+# ---------- Assets ----------
+ASSET_DIR = "assets"  # holds back.png, card01.png, card02.png, ... (paths come from the deck)
+BUILD_DIR = os.path.join(ASSET_DIR, "build")  # written by build_assets.py
+IMAGE_FORMATS = os.environ.get("TTX_IMAGE_FORMATS", "webp").split(",")  # preference order
+ASSET_CACHE_MB = int(os.environ.get("TTX_ASSET_CACHE_MB", "128"))
+CAS_DIR = os.environ.get("TTX_CAS_DIR", ".cas")  # content-addressed blobs (cas.py); "" = read by path
+
+# How card images reach the browser:
+#   inline - data: URIs inside the markdown (no extra setup, megabytes per rerun)
+#   static - content-hashed copies under ./static, served by Streamlit
+#            (needs server.enableStaticServing, see .streamlit/config.toml);
+#            URLs carry ?v=<id> so Streamlit's static handler sends a long max-age
+#   server - built-in asset endpoint with immutable cache headers (TTX_ASSET_PORT),
+#            reached at TTX_ASSET_BASE_URL, else at the host each browser used
+#            for the app itself (plain http; set the base URL behind HTTPS)
+ASSET_MODE = os.environ.get("TTX_ASSET_MODE", "inline")
+STATIC_DIR = "static"
+STATIC_URL = "app/static"
+ASSET_PORT = int(os.environ.get("TTX_ASSET_PORT", "8502"))
+# With several app processes per host, each takes the next free port; a fixed
+# TTX_ASSET_BASE_URL points at one port, so then each process needs its own TTX_ASSET_PORT.
+ASSET_PORT_TRIES = 1 if os.environ.get("TTX_ASSET_BASE_URL") else int(os.environ.get("TTX_ASSET_PORT_TRIES", "16"))
+ASSET_BASE_URL = os.environ.get("TTX_ASSET_BASE_URL", "").rstrip("/")
+# Card backs from a sprite sheet (build_assets.py --atlas); fronts stay one URL
+# each. URL modes only: a data URI sheet would be re-sent for every card.
+ATLAS_MODE = os.environ.get("TTX_ATLAS", "0") == "1" and ASSET_MODE != "inline"
+# Paint the manifest's tiny previews under images until they load. Inline images
+# arrive with the markup itself, so there is nothing to bridge in that mode.
+PROGRESSIVE = ASSET_MODE != "inline"
+
+@st.cache_resource
+def asset_store() -> AssetStore:
+    """One read-only store per server process, shared by all sessions."""
+    return AssetStore(max_bytes=ASSET_CACHE_MB * 1024 * 1024, cas=content_store())
+
+@st.cache_resource
+def content_store():
+    if not CAS_DIR:
+        return None
+    from cas import ContentStore
+    return ContentStore(CAS_DIR)
+
+@st.cache_resource
+def asset_manifest() -> Dict[str, Dict]:
+    """Derivative manifest from build_assets.py, read once at startup, keyed by source path."""
+    from build_assets import load_manifest
+    return {os.path.normpath(e["src"]): e for e in load_manifest(BUILD_DIR)["assets"].values() if "src" in e}
+
+def manifest_entry(path: str, sha256: str | None = None) -> Dict | None:
+    """Manifest entry of a source asset, if built from its current contents.
+
+    With `sha256` (known from the deck index) the match is by content hash.
+    """
+    entry = asset_manifest().get(os.path.normpath(path))
+    if entry is None:
+        return None
+    if sha256:
+        return entry if entry.get("sha256") == sha256 else None
+    try:
+        if os.stat(path).st_mtime_ns != entry["mtime_ns"]:
+            return None  # source edited since the last build
+    except OSError:
+        pass
+    return entry
+
+def variant_path(path: str, variant: str, sha256: str | None = None) -> str | None:
+    """Prebuilt `variant` ("board"/"zoom"/"screen") of an asset, if built from the current source."""
+    entry = manifest_entry(path, sha256)
+    if entry is None:
+        return None
+    for fmt in IMAGE_FORMATS:
+        v = entry["variants"].get(f"{variant}.{fmt}")
+        if v is not None:
+            return os.path.join(BUILD_DIR, v["file"])
+    return None
+
+@metrics.timer("load_asset")
+def load_asset(path: str, variant: str | None = None, sha256: str | None = None) -> str:
+    """Register an image in the shared store and return its asset ID.
+
+    Uses the prebuilt `variant` when available, else the original file.
+    `sha256` is the source's content hash from the deck index, if known.
+    """
+    built = variant_path(path, variant, sha256) if variant else None
+    return asset_store().add_file(built) if built else asset_store().add_file(path, sha256)
+
+@st.cache_resource(show_spinner=False)
+def preview_uri(path: str | None, deck_version: str = "") -> str | None:
+    """Tiny inline preview of a source asset, if build_assets.py made one."""
+    entry = manifest_entry(path) if path else None
+    return entry.get("preview") if entry else None
+
+def backdrop(*urls: str | None) -> str:
+    """style attribute painting `urls` (first on top) under an <img> until it loads."""
+    layers = ",".join(f"url({u})" for u in urls if u)
+    return f' style="background-image:{layers}"' if PROGRESSIVE and layers else ""
+
+@st.cache_resource
+def asset_server() -> Tuple[object | None, str]:
+    """(running server, "") or (None, why it could not start); a failed bind is not retried per asset."""
+    from asset_server import start_asset_server
+    try:
+        return start_asset_server(asset_store(), port=ASSET_PORT, tries=ASSET_PORT_TRIES), ""
+    except OSError as e:
+        return None, str(e)
+
+def asset_port() -> int:
+    server, error = asset_server()
+    if server is None:
+        st.error(f"TTX_ASSET_MODE=server: {error}. Set TTX_ASSET_PORT (per process) or another asset mode.")
+        st.stop()
+    return server.server_address[1]
+
+@st.cache_resource
+def publish_static(asset_id: str) -> str:
+    """Write the asset once under static/a/<id><ext> and return its URL."""
+    store = asset_store()
+    name = f"{asset_id}{store.ext(asset_id)}"
+    path = os.path.join(STATIC_DIR, "a", name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(store.get(asset_id))
+        os.replace(tmp, path)
+    return f"{STATIC_URL}/a/{name}?v={asset_id}"
+
+def asset_base_url() -> str:
+    """Asset server URL as this session's browser can reach it."""
+    if ASSET_BASE_URL:
+        return ASSET_BASE_URL
+    base = st.session_state.get("asset_base_url")
+    if base is None:
+        headers = getattr(getattr(st, "context", None), "headers", None) or {}
+        host = headers.get("Host", "")
+        if not host or headers.get("X-Forwarded-Proto", "http") != "http":
+            st.error("TTX_ASSET_MODE=server: set TTX_ASSET_BASE_URL (no request host, or the app is "
+                     "served over HTTPS and the asset server speaks plain HTTP).")
+            st.stop()
+        hostname = host if host.endswith("]") else host.rsplit(":", 1)[0]  # keep IPv6 [::1]
+        base = st.session_state.asset_base_url = f"http://{hostname}:{asset_port()}"
+    return base
+
+def asset_src(asset_id: str) -> str:
+    """URL (or data URI in inline mode) for an asset ID."""
+    if ASSET_MODE == "static":
+        return publish_static(asset_id)
+    if ASSET_MODE == "server":
+        asset_port()
+        return f"{asset_base_url()}/a/{asset_id}{asset_store().ext(asset_id)}"
+    return asset_store().data_uri(asset_id)
 
 # ---------- Background (1920x1080 recommended) ----------
-BG_PATH = "BG.png"
-with open(BG_PATH, "rb") as f:
-    bg_base64 = base64.b64encode(f.read()).decode()
+BG_PATH = "BG.png"  # build_assets.py adds a compressed screen-size variant
 
 # CSS + Title (fix stray quote)
-st.markdown(f"""
-<style>
+def build_css(bg_url: str) -> str:
+    return f"""
 /* App background & dark theme */
 .stApp {{
-  background: url("data:image/png;base64,{bg_base64}") no-repeat center center fixed;
+  background: url("{bg_url}") no-repeat center center fixed;
   background-size: cover;
   background-color: #0e1525 !important;
   color: #fff !important;
@@ -95,6 +284,8 @@ st.markdown(f"""
 .card-front {{ transform: rotateY(0deg); }}
 .card-back  {{ transform: rotateY(180deg); }}
 .img-fit {{ width: 100%; height: 100%; object-fit: cover; }}
+.preview {{ background-size: cover; background-position: center; background-repeat: no-repeat; }}
+.sprite  {{ background-repeat: no-repeat; }}
 
 /* Zoom overlay (CSS-only modal) */
 .overlay {{
@@ -120,163 +311,215 @@ st.markdown(f"""
   position: relative; font-weight: 700;
   box-shadow: 0 6px 16px rgba(0,0,0,0.35);
 }}
-</style>
-""", unsafe_allow_html=True)
-st.markdown('<div class="title-bg">Phased TTX Card Deck (All Phases)</div>', unsafe_allow_html=True)
+"""
+
+@st.cache_resource
+def page_style(base_url: str = "") -> str:
+    """The page <style> markup, built once per process (per asset base URL in server mode).
+
+    In server mode the stylesheet itself becomes a content-hashed asset, so
+    each rerun sends a one-line @import the browser resolves from its cache;
+    otherwise the CSS is inlined with the background referenced by URL (or, in
+    inline mode, as the small screen-size variant).
+    """
+    bg_id = asset_store().add_file(variant_path(BG_PATH, "screen") or BG_PATH)
+    css = build_css(asset_src(bg_id))
+    if ASSET_MODE == "server":
+        data = css.encode("utf-8")
+        css_id = asset_store().add_generated(("css", content_id(data)), lambda: data, "text/css")
+        return f'<style>@import url("{asset_src(css_id)}");</style>'
+    return f"<style>{css}</style>"
+
+html(page_style(asset_base_url() if ASSET_MODE == "server" else ""))
 
 # ---------- Cards (now 20% smaller on board) ----------
 CARD_W, CARD_H = 288, 432   # 360x540 * 0.8
 
 TEAMS = ["Team A", "Team B"]
 
-# Phase pools (keep all Qs/What-Ifs here)
-PHASES = {
-    "Phase 1 – Detection & Analysis": ["Q1", "Q2", "Q3"],
-    "Phase 2 – Containment & Eradication": ["Q4", "Q5", "Q6"],
-    "Phase 3 – Recovery": ["Q7", "Q8", "Q9"],
-    "Phase 4 – Post-Incident": ["Q10", "Q11", "Q12"],
-}
-
-# Deal counts per phase (3, 2, 2, 2)
-PHASE_DEAL_COUNT = {
-    "Phase 1 – Detection & Analysis": 3,
-    "Phase 2 – Containment & Eradication": 2,
-    "Phase 3 – Recovery": 2,
-    "Phase 4 – Post-Incident": 2,
-}
-
-# Flip limits per phase (3, 2, 2, 2)
-PHASE_FLIP_LIMIT = {
-    "Phase 1 – Detection & Analysis": 3,
-    "Phase 2 – Containment & Eradication": 2,
-    "Phase 3 – Recovery": 2,
-    "Phase 4 – Post-Incident": 2,
-}
-
-STORY = {
-    "Q1":  "Strategic: Activate CIRP immediately?",
-    "Q2":  "Tactical: First containment action?",
-    "Q3":  "Operational: HR calm comms?",
-    "Q4":  "Strategic: Partner notification timing?",
-    "Q5":  "Tactical: Isolate repos/servers?",
-    "Q6":  "Operational: Contact-center message?",
-    "Q7":  "Strategic: Ransom stance (LE & backups)?",
-    "Q8":  "Tactical: Verify backup integrity first?",
-    "Q9":  "Operational: Staff breach notice?",
-    "Q10": "Strategic: Improve CIRP + BCP?",
-    "Q11": "Tactical: Backup test + EDR + awareness?",
-    "Q12": "Wildcard: Chaos card / random constraint",
-}
-
-# ---------- Fallback card drawing (used if an image is missing) ----------
-def get_font(size: int):
+# Phase pools, deal counts (3, 2, 2, 2), flip limits and stories live in the
+# deck file (decks/ttx.json, or TTX_DECK), compiled once per process by deck.py
+# and hot-reloaded when the file changes.
+DECK_PATH = os.environ.get("TTX_DECK", os.path.join("decks", "ttx.json"))
+
+@st.cache_resource
+def deck_loader() -> DeckLoader:
+    return DeckLoader(DECK_PATH)
+
+DECK: DeckIndex = deck_loader().get()
+st.markdown(f'<div class="title-bg">{DECK.name} (All Phases)</div>', unsafe_allow_html=True)
+
+# ---------- Fallback cards (used if an image is missing) ----------
+# Drawn by placeholders.py; PNG bytes are memoized per node (memory + disk).
+@metrics.timer("draw_placeholder")
+def placeholder_back() -> str:
+    return asset_store().add_generated(("back", CARD_W, CARD_H), lambda: back_png(CARD_W, CARD_H))
+
+@metrics.timer("draw_placeholder")
+def placeholder_front(qid: str) -> str:
+    subtitle = DECK.story(qid)
+    return asset_store().add_generated(("front", qid, subtitle, CARD_W, CARD_H),
+                                       lambda: front_png(qid, subtitle, CARD_W, CARD_H))
+
+@st.cache_resource(show_spinner=False)
+def front_asset(qid: str, variant: str = "board", deck_version: str = "") -> str:
+    """Asset ID of a card's front, resolved on first flip/zoom and then shared by all rooms.
+
+    `variant` is "board" (grid) or "zoom" (overlay); both go through the shared store.
+    The deck index already knows whether the asset exists, so no filesystem probe here.
+    """
+    card = DECK.cards.get(qid)
+    # Use real front if the deck resolved one, else draw placeholder
+    if card is not None and card.asset.path:
+        try:
+            return load_asset(card.asset.path, variant, card.asset.sha256)
+        except Exception:
+            pass
+    return placeholder_front(qid)
+
+@st.cache_resource(show_spinner=False)
+def back_asset(deck_version: str = "") -> str:
+    # Load back image (fallback to drawn back if missing)
     try:
-        return ImageFont.truetype("DejaVuSans-Bold.ttf", size)
+        return load_asset(DECK.back.path, "board", DECK.back.sha256) if DECK.back.path else placeholder_back()
     except Exception:
-        return ImageFont.load_default()
-
-def draw_card_back() -> Image.Image:
-    NAVY=(16,34,64); WHITE=(248,251,255)
-    img = Image.new("RGB", (CARD_W, CARD_H), NAVY)
-    d = ImageDraw.Draw(img)
-    for x in range(-CARD_H, CARD_W+CARD_H, 36):
-        d.line([(x,0),(x+CARD_H,CARD_H)], fill=(255,255,255,32), width=2)
-    d.text((CARD_W//2, CARD_H//2-40), "🦉", anchor="mm", fill=WHITE)
-    img = ImageOps.expand(img, border=8, fill=(240,244,252))
-    img = ImageOps.expand(img, border=3, fill=(220,226,236))
-    return img
-
-def draw_front(label: str, subtitle: str) -> Image.Image:
-    NAVY=(16,34,64); STRIPE=(208,213,221); LIGHT=(236,240,248)
-    img = Image.new("RGB", (CARD_W, CARD_H), NAVY)
-    d = ImageDraw.Draw(img)
-    d.rectangle([0, int(CARD_H*0.16), CARD_W, int(CARD_H*0.19)], fill=STRIPE)
-    d.rectangle([0, int(CARD_H*0.72), CARD_W, int(CARD_H*0.75)], fill=STRIPE)
-    d.text((CARD_W//2, int(CARD_H*0.30)), label, anchor="mm", fill=LIGHT, font=get_font(68))
-    wrapped = textwrap.fill(subtitle, width=22)
-    d.multiline_text((CARD_W//2, int(CARD_H*0.55)), wrapped, anchor="mm",
-                     fill=LIGHT, font=get_font(24), align="center")
-    img = ImageOps.expand(img, border=8, fill=(240,244,252))
-    img = ImageOps.expand(img, border=3, fill=(220,226,236))
-    return img
-
-def pil_to_b64(img) -> str:
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return base64.b64encode(buf.getvalue()).decode("ascii")
+        return placeholder_back()
+
+# ---------- Warm-up ----------
+# Loads the back and every front (board and zoom variants) into the shared store
+# on a small thread pool, once per deck version: at server start and after every
+# deck reload. The first flip or zoom of a drill then finds everything cached.
+WARMUP_WORKERS = int(os.environ.get("TTX_WARMUP_WORKERS", "4"))  # 0 = off
+
+@st.cache_resource
+def warmup() -> Warmup | None:
+    return Warmup(WARMUP_WORKERS) if WARMUP_WORKERS else None
+
+def warm(path: str, variant: str, sha256: str | None = None):
+    """Load one asset variant and prepare what the browser will be sent for it."""
+    asset_id = load_asset(path, variant, sha256)
+    if ASSET_MODE == "inline":
+        asset_store().data_uri(asset_id)
+    elif ASSET_MODE == "static":
+        publish_static(asset_id)
+
+def card_tasks(qids, variants=("board", "zoom")) -> List:
+    tasks = []
+    for qid in qids:
+        card = DECK.cards.get(qid)
+        if card is None or not card.asset.path:
+            tasks.append((("placeholder", qid), lambda q=qid: placeholder_front(q)))
+            continue
+        tasks += [(("asset", card.asset.path, v), lambda a=card.asset, v=v: warm(a.path, v, a.sha256))
+                  for v in variants]
+    return tasks
+
+@st.cache_resource(show_spinner=False)
+def warm_deck(deck_version: str) -> int:
+    pool = warmup()
+    if pool is None:
+        return 0
+    back_task = (lambda a=DECK.back: warm(a.path, "board", a.sha256)) if DECK.back.path else placeholder_back
+    back = [(("back", DECK.back.path), back_task)]
+    return pool.submit(f"Deck {deck_version[:8]}", back + card_tasks(DECK.cards))
+
+def prefetch_zoom(phase_name: str, cards: Tuple[str, ...]):
+    """First flip in a phase: its other cards are likely to be zoomed next."""
+    pool = warmup()
+    if pool is not None:
+        pool.submit(f"Zoom · {phase_name}", card_tasks(cards, ("zoom",)))
+
+warm_deck(DECK.version)
 
 # ---------- State ----------
+# Game state lives in shared rooms (rooms.py): teams on the same room code see
+# one board. Sessions keep only their room code, zoom and markup memo.
+# Rooms are journaled to STATE_DB (persistence.py) and the room code sits in the
+# URL (?room=...), so a refresh or a server restart rejoins the same board.
+ROOM_TTL = float(os.environ.get("TTX_ROOM_TTL", str(6 * 3600)))
+STATE_DB = os.environ.get("TTX_STATE_DB", os.path.join(".cache", "rooms.sqlite3"))  # "" = memory only
+
+def deal_from_deck():
+    deck = deck_loader().get()
+    return deal(deck.pools, deck.deal_counts)
+
+@st.cache_resource
+def event_log() -> "EventLog | None":
+    if not STATE_DB:
+        return None
+    from persistence import EventLog
+    return EventLog(STATE_DB, retention=ROOM_TTL)
+
+@st.cache_resource
+def room_store() -> RoomStore:
+    # DEAL only 3 / 2 / 2 / 2 per phase; fronts are resolved lazily (front_asset)
+    return RoomStore(deal_from_deck, n_teams=len(TEAMS), ttl=ROOM_TTL, event_log=event_log())
+
 def init():
-    if "cards" in st.session_state:
+    if "room_id" in st.session_state:
         return
-
-    # Load back image (fallback to drawn back if missing)
-    try:
-        back_b64 = load_image_b64("back.png")
-    except Exception:
-        back_b64 = pil_to_b64(draw_card_back())
-
-    cards: Dict[str, List[Dict]] = {}
-    for ph, ids in PHASES.items():
-        ids_pool = ids[:]
-        random.shuffle(ids_pool)
-        # DEAL only 3 / 2 / 2 / 2 per phase
-        deal_n = PHASE_DEAL_COUNT.get(ph, len(ids_pool))
-        chosen = ids_pool[:deal_n]
-
-        phase_cards = []
-        for qid in chosen:
-            # Map Q-id like "Q7" -> "card07.png"
-            try:
-                qnum = int(qid[1:])
-            except ValueError:
-                qnum = 0  # safety; will fall back to placeholder
-            img_filename = f"card{qnum:02}.png"
-            img_path = os.path.join(ASSET_DIR, img_filename)
-
-            # Use real front if exists, else draw placeholder
-            if os.path.exists(img_path):
-                try:
-                    front_b64 = load_image_b64(img_filename)
-                except Exception:
-                    front_b64 = pil_to_b64(draw_front(qid, STORY.get(qid, "")))
-            else:
-                front_b64 = pil_to_b64(draw_front(qid, STORY.get(qid, "")))
-
-            phase_cards.append({
-                "id": qid,
-                "front": front_b64,
-                "back": back_b64,
-                "flipped": False,
-                "owner": None,
-            })
-
-        cards[ph] = phase_cards
-
-    st.session_state.cards = cards
-    st.session_state.turn = 0
-    st.session_state.score = {t: 0 for t in TEAMS}
-    st.session_state.zoom: Tuple[str, int] | None = None
+    st.session_state.sid = uuid.uuid4().hex  # metrics only
+    # rejoin the room in the URL, else a private room until joining another
+    st.session_state.room_id = st.query_params.get("room", "").strip().upper() or uuid.uuid4().hex[:6].upper()
+    st.query_params["room"] = st.session_state.room_id
+    st.session_state.phase_html = {}
+    st.session_state.seen_version = 0  # room version this screen has caught up to
+    st.session_state.drawn = {}  # phase -> phase version this screen last drew
+    st.session_state.zoom: Tuple[str, str] | None = None  # (phase, card id)
 
 init()
 
+METRICS_FILE = os.environ.get("TTX_METRICS_FILE", "")   # Prometheus text, rewritten every 10 s
+METRICS_PORT = int(os.environ.get("TTX_METRICS_PORT", "0"))  # GET /metrics when set
+
+def _cache_gauges() -> Dict[str, float]:
+    a, r = asset_store().stats(), render_cache.stats()
+    return {
+        "asset_cache_hits": a["hits"], "asset_cache_misses": a["misses"],
+        "asset_cache_bytes": a["bytes"], "asset_cache_entries": a["entries"],
+        "placeholder_cache_hits": r["hits"] + r["disk_hits"], "placeholder_cache_misses": r["misses"],
+        "rooms": len(room_store()),
+        **({f"event_log_{k}": v for k, v in event_log().stats().items()} if event_log() else {}),
+    }
+
+@st.cache_resource
+def metrics_exporters() -> bool:
+    metrics.add_collector(_cache_gauges)
+    if METRICS_FILE:
+        metrics.start_file_writer(METRICS_FILE)
+    if METRICS_PORT:
+        metrics.start_server(port=METRICS_PORT)
+    return True
+
+metrics_exporters()
+
+def current_room() -> Room:
+    room = room_store().get(st.session_state.room_id)
+    if room.phases.keys() != DECK.phases.keys():
+        room.reset(deal_from_deck())  # deck reloaded with different phases
+    return room
+
+def join_room():
+    code = st.session_state.room_input.strip().upper()
+    if code:
+        st.session_state.room_id = code
+        st.query_params["room"] = code
+        st.session_state.phase_html = {}
+        st.session_state.drawn = {}
+        st.session_state.seen_version = current_room().version
+        st.session_state.zoom = None
+
 # ---------- Admin / helpers ----------
 def reset_all():
-    st.session_state.pop("cards", None)
-    init()
+    room_store().reset(st.session_state.room_id)
+    st.session_state.zoom = None
 
 def shuffle_unflipped_in_phase(phase_name: str):
-    pcs = st.session_state.cards[phase_name]
-    flipped = [c for c in pcs if c["flipped"]]
-    unflipped = [c for c in pcs if not c["flipped"]]
-    random.shuffle(unflipped)
-    st.session_state.cards[phase_name] = flipped + unflipped
+    current_room().shuffle_unflipped(phase_name)
 
 def phase_effective_limit(phase_name: str, enforce: bool, global_limit: int) -> int:
     """Respect old sidebar controls but enforce 3/2/2/2 when 'enforce' is True."""
-    if not enforce:
-        return 0  # unlimited
-    return PHASE_FLIP_LIMIT.get(phase_name, global_limit or 0)
+    return effective_limit(DECK.phases[phase_name].flip_limit, enforce, global_limit)
 
 def can_flip(phase_name: str, enforce: bool, limit: int, reveal_all: bool) -> bool:
     if reveal_all:
@@ -284,24 +527,26 @@ def can_flip(phase_name: str, enforce: bool, limit: int, reveal_all: bool) -> bo
     eff_limit = phase_effective_limit(phase_name, enforce, limit)
     if eff_limit == 0:
         return True
-    pcs = st.session_state.cards[phase_name]
-    return sum(c["flipped"] for c in pcs) < eff_limit
-
-def flip_card(phase_name: str, idx: int):
-    card = st.session_state.cards[phase_name][idx]
-    if card["flipped"]:
-        return
-    team = TEAMS[st.session_state.turn]
-    card["flipped"] = True
-    card["owner"] = team
-    st.session_state.score[team] += 1
-    st.session_state.turn = 1 - st.session_state.turn
-
-def toggle_zoom(phase_name: str, idx: int):
-    st.session_state.zoom = None if st.session_state.zoom == (phase_name, idx) else (phase_name, idx)
+    return current_room().phases[phase_name].picked() < eff_limit
+
+def flip_card(phase_name: str, card_id: str, limit: int = 0):
+    """Atomic in the room: a concurrent flip past the limit is rejected."""
+    front_asset(card_id, "board", DECK.version)
+    room = current_room()
+    if room.flip(phase_name, card_id, limit):
+        cards, flipped, _, _ = room.snapshot(phase_name)
+        if bin(flipped).count("1") == 1:
+            prefetch_zoom(phase_name, cards)
+
+def toggle_zoom(phase_name: str, card_id: str):
+    front_asset(card_id, "zoom", DECK.version)
+    key = (phase_name, card_id)
+    st.session_state.zoom = None if st.session_state.zoom == key else key
+    current_room().set_zoom(st.session_state.zoom)
 
 def close_zoom():
     st.session_state.zoom = None
+    current_room().set_zoom(None)
 
 # ---------- Sidebar (old UI preserved) ----------
 with st.sidebar:
@@ -311,6 +556,14 @@ with st.sidebar:
         st.caption("Visible only while a card is zoomed.")
         st.markdown("---")
 
+    st.subheader("Room")
+    st.text_input("Room code", value=st.session_state.room_id, key="room_input", on_change=join_room,
+                  help="Share this code so other screens join the same board.")
+    st.checkbox("Follow room zoom", key="follow_zoom",
+                help="Viewer/facilitator screens: open and close zooms along with the room.")
+    st.caption(f"{len(room_store())} active rooms on this server.")
+    st.markdown("---")
+
     enforce_limit = st.checkbox("Enforce phase limit", value=True)
     limit_per_phase = st.number_input("Limit per phase (0 = unlimited)", min_value=0, max_value=3, value=2, step=1)
     st.caption("Tip: set 0 or toggle off to allow opening the 3rd card.")
@@ -318,127 +571,292 @@ with st.sidebar:
     st.markdown("---")
     st.subheader("Per-Phase Override")
     phase_reveal_flags: Dict[str, bool] = {}
-    for ph in PHASES:
+    for ph in DECK.phases:
         phase_reveal_flags[ph] = st.checkbox(f"Reveal all in {ph}", value=False, key=f"reveal_{ph}")
     st.markdown("---")
     st.button("🔄 Reset All", on_click=reset_all, use_container_width=True)
-    for ph in PHASES:
+    for ph in DECK.phases:
         st.button(f"🔀 Shuffle Unflipped – {ph}", on_click=shuffle_unflipped_in_phase,
                   args=(ph,), use_container_width=True, key=f"shuf_{ph}")
 
     st.markdown("---")
     st.header("Teams & Score")
-    st.write(f"**Current Turn:** {TEAMS[st.session_state.turn]}")
-    for t in TEAMS:
-        st.write(f"- {t}: {st.session_state.score[t]}")
+
+    @fragment(run_every=SCORE_REFRESH)
+    def scoreboard():
+        # flips rerun only their phase, so the score refreshes on its own
+        room = current_room()
+        st.write(f"**Current Turn:** {TEAMS[room.turn]}")
+        for i, t in enumerate(TEAMS):
+            st.write(f"- {t}: {room.score[i]}")
+
+    scoreboard()
 
     st.markdown("---")
     st.header("🎲 Quick Random Assignment")
 
     if st.button("Randomize Phase Assignment", use_container_width=True, type="primary"):
-        all_phases = list(PHASES.keys())
-        random.shuffle(all_phases)
-        # Split 4 phases → 2 for Team A, 2 for Team B
-        team_a_phases = all_phases[:2]
-        team_b_phases = all_phases[2:]
-        st.session_state["team_phase_map"] = {
-            "Team A": team_a_phases,
-            "Team B": team_b_phases
-        }
+        # Split 4 phases → 2 for Team A, 2 for Team B (shared by the whole room)
+        current_room().assign_phases(TEAMS)
 
     # Show current assignment (if any)
-    if "team_phase_map" in st.session_state:
+    team_phase_map = current_room().team_phase_map
+    if team_phase_map:
         st.subheader("Current Phase Assignment")
-        for team, phases in st.session_state["team_phase_map"].items():
+        for team, phases in team_phase_map.items():
             st.write(f"**{team}:** {', '.join(phases)}")
     else:
         st.caption("Press the button above to randomly assign phases to each team.")
 
+    st.markdown("---")
+    with st.expander("Asset cache"):
+        stats = asset_store().stats()
+        st.write(f"Hits / misses: {stats['hits']} / {stats['misses']} (evictions: {stats['evictions']})")
+        st.write(f"Cached: {stats['entries']} assets, {stats['bytes'] / 1e6:.1f} / {stats['max_bytes'] / 1e6:.0f} MB")
+        rs = render_cache.stats()
+        st.write(f"Placeholders: {rs['hits']} hits, {rs['disk_hits']} disk, {rs['misses']} rendered")
+        if content_store() is not None:
+            cs = content_store().stats()
+            st.write(f"Content store: {cs['paths']} paths → {cs['objects']} blobs, "
+                     f"{cs['deduped_bytes'] / 1e3:.0f} kB deduplicated, {cs['mapped']} mapped")
+
+    with st.expander("Warm-up"):
+        @fragment(run_every=SCORE_REFRESH)
+        def warmup_progress():
+            pool = warmup()
+            if pool is None:
+                st.caption("Off (TTX_WARMUP_WORKERS=0).")
+                return
+            wp = pool.progress()
+            if not wp["total"]:
+                st.caption("Nothing queued yet.")
+                return
+            state = "loading" if wp["busy"] else "done"
+            st.progress(wp["done"] / wp["total"],
+                        text=f"{wp['label']}: {wp['done']}/{wp['total']} {state} in {wp['seconds']:.1f}s")
+            if wp["failed"]:
+                st.caption(f"{wp['failed']} failed; last: {pool.errors[-1] if pool.errors else '?'}")
+
+        warmup_progress()
+
+    with st.expander("Metrics"):
+        gauges = metrics.gauges()
+        reruns = metrics.counters.get("reruns", 0)
+        st.write(f"Active sessions: {gauges['active_sessions']} · rooms: {gauges.get('rooms', 0)}")
+        st.write(f"Full reruns: {reruns:g} · HTML sent: "
+                 f"{metrics.counters.get('emitted_html_bytes', 0) / max(reruns, 1) / 1e3:.1f} kB/rerun")
+        st.write(f"Fragment reruns (sync polls included): {metrics.counters.get('fragment_reruns', 0):g} · "
+                 f"HTML sent: {metrics.counters.get('fragment_html_bytes', 0) / 1e3:.1f} kB in total")
+        st.write(f"Session state: {gauges['session_state_bytes_max'] / 1e3:.1f} kB max")
+        st.table([
+            {"timer": name, "count": int(n), "avg ms": round(total / n * 1e3, 2), "max ms": round(peak * 1e3, 2)}
+            for name, (n, total, peak) in sorted(metrics.timers.items())
+        ])
+
 
 # ---------- Main: 2×2 Grid of Phases ----------
 st.caption("Inject 1 flips up to 3 cards; Inject 2–4 flip up to 2. Click **Zoom** on a flipped card.")
 
-def render_phase(phase_name: str):
-    pcs = st.session_state.cards[phase_name]
-    picked = sum(c["flipped"] for c in pcs)
-    eff_limit = phase_effective_limit(phase_name, enforce_limit, limit_per_phase)
-    limit_txt = f"{eff_limit if eff_limit else '∞'}"
-    st.markdown(
-        f'<div class="phase-title">{phase_name} '
-        f'<span class="badge">{picked}/{limit_txt}</span></div>',
-        unsafe_allow_html=True
-    )
-    # columns adapt to the number of dealt cards for this phase
-    cols = st.columns(len(pcs), gap="small")
-    for i, col in enumerate(cols):
-        with col:
-            card = pcs[i]
-            front = f"data:image/png;base64,{card['front']}"
-            back  = f"data:image/png;base64,{card['back']}"
-            flipped_class = "flipped" if card["flipped"] else ""
-            st.markdown(f"""
+@st.cache_resource(show_spinner=False)
+def atlas_map(deck_version: str) -> Dict | None:
+    """Sprite-sheet coordinates of the back for this deck version, or None if not built for it."""
+    from build_assets import ATLAS_LAYOUT, load_atlas
+    atlas = load_atlas(BUILD_DIR)
+    # older layouts also packed fronts: loading a sheet would send face-down questions
+    return atlas if atlas.get("deck_version") == deck_version and atlas.get("layout") == ATLAS_LAYOUT else None
+
+def sprite_html(atlas: Dict, key: str) -> str:
+    """A board face cut out of its sheet with background-position."""
+    pos = atlas["cards"][key]
+    sheet = atlas["sheets"][pos["sheet"]]
+    cols, rows = sheet["cols"], sheet["rows"]
+    url = asset_src(load_asset(os.path.join(BUILD_DIR, sheet["file"])))
+    x = pos["col"] / (cols - 1) * 100 if cols > 1 else 0
+    y = pos["row"] / (rows - 1) * 100 if rows > 1 else 0
+    return (f'<div class="img-fit sprite" style="background-image:url({url});'
+            f'background-size:{cols * 100}% {rows * 100}%;background-position:{x:g}% {y:g}%"></div>')
+
+def card_html(card_id: str, flipped: bool) -> str:
+    atlas = atlas_map(DECK.version) if ATLAS_MODE else None
+    # unflipped fronts are never sent (nor loaded); each front is its own URL
+    card = DECK.cards.get(card_id)
+    src = asset_src(front_asset(card_id, "board", DECK.version)) if flipped else ""
+    front_preview = backdrop(preview_uri(card.asset.path if card else None, DECK.version)) if flipped else ""
+    front = f'<img class="img-fit preview"{front_preview} src="{src}"/>' if flipped else ""
+    if atlas is not None:
+        from build_assets import ATLAS_BACK
+        back_face = sprite_html(atlas, ATLAS_BACK)
+    else:
+        back_face = (f'<img class="img-fit preview"{backdrop(preview_uri(DECK.back.path, DECK.version))} '
+                     f'src="{asset_src(back_asset(DECK.version))}"/>')
+    flipped_class = "flipped" if flipped else ""
+    return f"""
             <div class="card-container">
               <div class="card {flipped_class}">
                 <div class="card-inner">
                   <div class="card-face card-front">
-                    <img class="img-fit" src="{back}"/>
+                    {back_face}
                   </div>
                   <div class="card-face card-back">
-                    <img class="img-fit" src="{front}"/>
+                    {front}
                   </div>
                 </div>
               </div>
             </div>
-            """, unsafe_allow_html=True)
+            """
+
+# Inline markup embeds the images themselves: keeping it per session would copy
+# every data URI into every session, so it is rebuilt from the shared store.
+MEMO_MARKUP = ASSET_MODE != "inline"
+
+def phase_markup(phase_name: str, cards: Tuple[str, ...], flipped: int, version: int) -> List[str]:
+    """Card markup for a phase; in URL modes kept per session until the room's phase version changes."""
+    cached = st.session_state.phase_html.get(phase_name)
+    if cached is None or cached[0] != version:
+        with metrics.timed("phase_html"):
+            cached = (version, [card_html(cid, bool(flipped >> i & 1)) for i, cid in enumerate(cards)])
+        if MEMO_MARKUP:
+            st.session_state.phase_html[phase_name] = cached
+    return cached[1]
+
+@fragment
+@metrics.timer("render_phase")
+def render_phase(phase_name: str):
+    """One phase of the grid; a Flip inside it reruns (and resends) only this phase."""
+    cards, flipped, owners, version = current_room().snapshot(phase_name)
+    st.session_state.drawn[phase_name] = version
+    markup = phase_markup(phase_name, cards, flipped, version)
+    picked = bin(flipped).count("1")
+    eff_limit = phase_effective_limit(phase_name, enforce_limit, limit_per_phase)
+    limit_txt = f"{eff_limit if eff_limit else '∞'}"
+    html(
+        f'<div class="phase-title">{phase_name} '
+        f'<span class="badge">{picked}/{limit_txt}</span></div>'
+    )
+    # columns adapt to the number of dealt cards for this phase
+    reveal_all = phase_reveal_flags[phase_name]
+    flip_limit = 0 if reveal_all else eff_limit
+    cols = st.columns(len(cards), gap="small")
+    for i, col in enumerate(cols):
+        with col:
+            card_id, is_up = cards[i], bool(flipped >> i & 1)
+            html(markup[i])
             b1, b2 = st.columns(2, gap="small")
             with b1:
-                flip_disabled = card["flipped"] or not can_flip(
-                    phase_name, enforce_limit, limit_per_phase, phase_reveal_flags[phase_name]
+                flip_disabled = is_up or not can_flip(
+                    phase_name, enforce_limit, limit_per_phase, reveal_all
                 )
                 st.button("Flip", key=f"flip_{phase_name}_{i}", on_click=flip_card,
-                          args=(phase_name, i), disabled=flip_disabled, use_container_width=True)
+                          args=(phase_name, card_id, flip_limit), disabled=flip_disabled,
+                          use_container_width=True)
             with b2:
-                st.button("Zoom", key=f"zoom_{phase_name}_{i}", on_click=toggle_zoom,
-                          args=(phase_name, i), disabled=not card["flipped"], use_container_width=True)
-            if card["flipped"]:
-                st.caption(f"**{card['id']}** → {card['owner']}")
-                st.caption(STORY.get(card["id"], ""))
-
-# 2×2 matrix layout
-row1 = st.columns(2, gap="large")
-with row1[0]:
-    st.markdown('<div class="phase-box">', unsafe_allow_html=True)
-    render_phase("Phase 1 – Detection & Analysis")
-    st.markdown('</div>', unsafe_allow_html=True)
-with row1[1]:
-    st.markdown('<div class="phase-box">', unsafe_allow_html=True)
-    render_phase("Phase 2 – Containment & Eradication")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-st.markdown('<hr class="hr-compact">', unsafe_allow_html=True)
-
-row2 = st.columns(2, gap="large")
-with row2[0]:
-    st.markdown('<div class="phase-box">', unsafe_allow_html=True)
-    render_phase("Phase 3 – Recovery")
-    st.markdown('</div>', unsafe_allow_html=True)
-with row2[1]:
-    st.markdown('<div class="phase-box">', unsafe_allow_html=True)
-    render_phase("Phase 4 – Post-Incident")
-    st.markdown('</div>', unsafe_allow_html=True)
+                if st.button("Zoom", key=f"zoom_{phase_name}_{i}",
+                             disabled=not is_up, use_container_width=True):
+                    toggle_zoom(phase_name, card_id)
+                    st.rerun()  # the overlay lives outside this phase
+            if is_up:
+                st.caption(f"**{card_id}** → {TEAMS[owners[i]]}")
+                st.caption(DECK.story(card_id))
+
+# 2×2 matrix layout (two phases per row, however many the deck defines)
+phase_names = list(DECK.phases)
+for r in range(0, len(phase_names), 2):
+    if r:
+        st.markdown('<hr class="hr-compact">', unsafe_allow_html=True)
+    row = st.columns(2, gap="large")
+    for col, ph in zip(row, phase_names[r:r + 2]):
+        with col:
+            st.markdown('<div class="phase-box">', unsafe_allow_html=True)
+            render_phase(ph)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+# ---------- Room sync ----------
+@fragment(run_every=SYNC_INTERVAL)
+def room_sync():
+    """Pull room changes since this screen's last version; the only polling unit.
+
+    Emits nothing while idle or when this screen already drew the change (its
+    own flips). A flip, shuffle or reset from another screen, a followed zoom,
+    a new phase assignment (sidebar) or a log that no longer reaches back
+    trigger one rerun; phase fragments never poll, so idle screens send nothing.
+    """
+    room = current_room()
+    version, changes = room.changes_since(st.session_state.seen_version)
+    if changes == []:
+        return
+    st.session_state.seen_version = version
+    stale = changes is None
+    drawn = st.session_state.drawn
+    for c in changes or ():
+        if c.kind in ("flip", "shuffle", "reset"):
+            touched = [c.phase] if c.phase else list(room.phases)
+            stale = stale or any(room.snapshot(ph)[3] != drawn.get(ph) for ph in touched)
+        elif c.kind == "zoom":
+            target = (c.phase, c.card_id) if c.phase else None
+            if st.session_state.get("follow_zoom") and target != st.session_state.zoom:
+                st.session_state.zoom = target
+                stale = True
+        elif c.kind == "assign":
+            stale = True
+    if stale:
+        st.rerun()
+
+room_sync()
 
 # ---------- Zoom overlay ----------
-if st.session_state.zoom is not None:
-    ph, idx = st.session_state.zoom
-    card = st.session_state.cards[ph][idx]
-    img_b64 = card["front"] if card["flipped"] else card["back"]
-    st.markdown(f"""
+def zoom_size(path: str | None) -> Tuple[int, int]:
+    """Pixel size of the zoom variant, so the overlay reserves its box before the image loads."""
+    entry = manifest_entry(path) if path else None
+    for key, v in (entry or {}).get("variants", {}).items():
+        if key.startswith("zoom."):
+            return v["width"], v["height"]
+    return CARD_W, CARD_H
+
+@fragment
+@metrics.timer("zoom_overlay")
+def zoom_overlay():
+    """Closing the zoom reruns only this unit, not the grid."""
+    if st.session_state.zoom is None:
+        return
+    ph, card_id = st.session_state.zoom
+    cards, flipped, _, _ = current_room().snapshot(ph)
+    is_up = card_id in cards and bool(flipped >> cards.index(card_id) & 1)
+    card = DECK.cards.get(card_id)
+    path = (card.asset.path if card else None) if is_up else DECK.back.path
+    # the zoom variant is fetched only now; until it lands, show the board image
+    # this screen already has (then the tiny preview) under it, at the final size
+    if is_up:
+        img_id = front_asset(card_id, "zoom", DECK.version)
+        under = backdrop(asset_src(front_asset(card_id, "board", DECK.version)), preview_uri(path, DECK.version))
+    else:
+        img_id = back_asset(DECK.version)
+        under = backdrop(preview_uri(path, DECK.version))
+    w, h = zoom_size(path)
+    html(f"""
     <div class="overlay">
       <div class="cardwrap">
-        <img src="data:image/png;base64,{img_b64}" />
+        <img class="preview"{under} width="{w}" height="{h}" src="{asset_src(img_id)}" />
       </div>
     </div>
-    """, unsafe_allow_html=True)
+    """)
     st.markdown('<div class="closebar">', unsafe_allow_html=True)
     st.button("✕ Close Zoom", on_click=close_zoom, type="primary")
     st.markdown('</div>', unsafe_allow_html=True)
+
+zoom_overlay()
+
+# ---------- Metrics ----------
+def session_state_bytes() -> int:
+    """Pickled size of everything this session keeps (widget values included)."""
+    total = 0
+    for value in st.session_state.to_dict().values():
+        try:
+            total += len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            pass  # unpicklable values are not ours (e.g. widget callbacks)
+    return total
+
+metrics.observe("rerun", time.perf_counter() - _rerun_t0)
+metrics.inc("reruns")
+metrics.session(st.session_state.sid, session_state_bytes())
+_script_done = True
@@ -0,0 +1,135 @@
+# simulate.py
+# Monte Carlo drill simulator for tuning deal counts and flip limits.
+# Reuses the game rules: deck pools / deal counts / flip limits (deck.py),
+# effective_limit (rooms.py, same as the sidebar "Enforce phase limit" and
+# "Limit per phase"), alternating turns across all flips as in Room.flip, and
+# the even team/phase split of "Randomize Phase Assignment". Drills run as
+# NumPy-batched permutations; needs numpy.
+#
+#   python simulate.py --drills 1000000 --seed 7
+#   python simulate.py --limit 3 --no-enforce --flip-rate 0.8 --json sim.json
+
+import argparse, json, math, sys, time
+from typing import Dict, List, Optional
+
+from deck import DEFAULT_DECK, DeckIndex, compile_deck
+from rooms import effective_limit
+
+BATCH = 250_000  # drills per vectorized batch; bounds memory
+
+
+def simulate(deck: DeckIndex, drills: int, seed: Optional[int] = None, teams: int = 2,
+             enforce: bool = True, global_limit: int = 2, flip_rate: float = 1.0,
+             batch: int = BATCH) -> Dict:
+    """Run `drills` games and return exposure, ownership, score and assignment statistics.
+
+    Each phase is dealt from a shuffled pool; players then flip up to the
+    effective limit, taking each allowed flip with probability `flip_rate`.
+    Flips alternate between teams across phases in deck order.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    phases = list(deck.phases.values())
+    names = [p.name for p in phases]
+    exposure = {p.name: np.zeros(len(p.cards), dtype=np.int64) for p in phases}
+    owned = {p.name: np.zeros((len(p.cards), teams), dtype=np.int64) for p in phases}
+    max_flips = sum(len(p.cards) for p in phases)
+    score_hist = np.zeros((teams, max_flips + 1), dtype=np.int64)
+    assign = np.zeros((teams, len(phases)), dtype=np.int64)
+    per_team = len(phases) // teams
+
+    done = 0
+    while done < drills:
+        n = min(batch, drills - done)
+        total = np.zeros(n, dtype=np.int64)  # flips so far this drill = whose turn it is
+        score = np.zeros((n, teams), dtype=np.int64)
+        for p in phases:
+            pool = len(p.cards)
+            # random order of the pool; the first `deal` positions are dealt, and since
+            # the order is uniform, flipping the first k of them is a uniform choice
+            perm = rng.random((n, pool)).argsort(axis=1)
+            limit = effective_limit(p.flip_limit, enforce, global_limit) or p.deal
+            allowed = min(limit, p.deal)
+            flips = rng.binomial(allowed, flip_rate, size=n) if flip_rate < 1 else np.full(n, allowed)
+            for j in range(allowed):
+                took = j < flips
+                card = perm[took, j]
+                team = (total[took] + j) % teams
+                exposure[p.name] += np.bincount(card, minlength=pool)
+                owned[p.name] += np.bincount(card * teams + team, minlength=pool * teams).reshape(pool, teams)
+                score[took, team] += 1
+            total += flips
+        for t in range(teams):
+            score_hist[t] += np.bincount(score[:, t], minlength=max_flips + 1)[:max_flips + 1]
+        # Randomize Phase Assignment: shuffle phases, split evenly across teams
+        order = rng.random((n, len(phases))).argsort(axis=1)
+        for t in range(teams):
+            assign[t] += np.bincount(order[:, t * per_team:(t + 1) * per_team].ravel(), minlength=len(phases))
+        done += n
+
+    def dist(hist):
+        values = np.arange(len(hist))
+        mean = float((hist * values).sum() / drills)
+        var = float((hist * (values - mean) ** 2).sum() / drills)
+        nz = np.nonzero(hist)[0]
+        return {"mean": round(mean, 4), "std": round(math.sqrt(var), 4),
+                "pmf": {int(v): round(float(hist[v]) / drills, 6) for v in nz}}
+
+    return {
+        "deck": deck.name,
+        "drills": drills,
+        "seed": seed,
+        "params": {"teams": teams, "enforce": enforce, "global_limit": global_limit, "flip_rate": flip_rate},
+        "exposure": {ph: {cid: round(float(c) / drills, 6) for cid, c in zip(deck.phases[ph].cards, exposure[ph])}
+                     for ph in names},
+        "ownership": {ph: {cid: [round(float(x) / drills, 6) for x in row]
+                           for cid, row in zip(deck.phases[ph].cards, owned[ph])}
+                      for ph in names},
+        "score": [dist(score_hist[t]) for t in range(teams)],
+        "phase_assignment": [{ph: round(float(c) / drills, 6) for ph, c in zip(names, assign[t])}
+                             for t in range(teams)],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Monte Carlo simulation of TTX drills.")
+    ap.add_argument("--deck", default=DEFAULT_DECK)
+    ap.add_argument("--drills", type=int, default=1_000_000)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--teams", type=int, default=2)
+    ap.add_argument("--limit", type=int, default=2, help='sidebar "Limit per phase" (0 = unlimited)')
+    ap.add_argument("--no-enforce", action="store_true", help='"Enforce phase limit" off')
+    ap.add_argument("--flip-rate", type=float, default=1.0, help="chance each allowed flip is taken")
+    ap.add_argument("--batch", type=int, default=BATCH)
+    ap.add_argument("--json", default=None, help="write the full result here")
+    args = ap.parse_args(argv)
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("simulate.py needs numpy (pip install numpy)", file=sys.stderr)
+        return 2
+
+    t0 = time.perf_counter()
+    res = simulate(compile_deck(args.deck), args.drills, seed=args.seed, teams=args.teams,
+                   enforce=not args.no_enforce, global_limit=args.limit,
+                   flip_rate=args.flip_rate, batch=args.batch)
+    elapsed = time.perf_counter() - t0
+
+    print(f"{res['drills']:,} drills of {res['deck']} in {elapsed:.1f}s (seed {res['seed']})")
+    for ph, cards in res["exposure"].items():
+        print(f"  {ph}")
+        print("    exposure " + "  ".join(f"{cid} {p:.3f}" for cid, p in cards.items()))
+    for t, sc in enumerate(res["score"]):
+        print(f"  team {t}: score mean {sc['mean']:.2f} ± {sc['std']:.2f}")
+    for t, a in enumerate(res["phase_assignment"]):
+        print(f"  team {t} assigned: " + "  ".join(f"{p:.3f}" for p in a.values()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=1, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
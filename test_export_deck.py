@@ -0,0 +1,90 @@
+# test_export_deck.py
+# Print spec, job list, content hashes and the skip-if-unchanged re-export.
+#
+#   python -m pytest -q test_export_deck.py
+
+import concurrent.futures, json, os
+
+import pytest
+
+import export_deck
+from deck import DEFAULT_DECK, compile_deck
+from export_deck import BACK, card_hash, card_jobs, export_deck as run_export, print_spec
+
+
+@pytest.fixture
+def deck():
+    return compile_deck(DEFAULT_DECK)
+
+
+def test_print_spec_a4_300dpi():
+    spec = print_spec()
+    assert spec.trim == (744, 1039)
+    assert spec.bleed == 24
+    assert spec.cell == (792, 1087)
+    assert spec.page == (2480, 3508)
+    assert spec.grid == (3, 3)
+    assert print_spec(dpi=600).grid == (3, 3)
+
+
+def test_card_jobs_back_first_then_phase_order(deck):
+    jobs = card_jobs(deck)
+    assert jobs[0] == (BACK, deck.back.path, "", "")
+    assert [name for name, *_ in jobs[1:]] == [cid for p in deck.phases.values() for cid in p.cards]
+    for name, path, label, story in jobs[1:]:
+        assert path == deck.cards[name].asset.path and label == name and story == deck.cards[name].story
+
+
+def test_card_hash_follows_source_and_spec(deck):
+    spec = print_spec()
+    name, _, _, story = card_jobs(deck)[1]
+    h = card_hash(deck, name, story, spec)
+    assert h == card_hash(deck, name, story, print_spec())
+    assert h != card_hash(deck, name, story, print_spec(dpi=600))
+    assert h != card_hash(deck, name, story, print_spec(bleed_mm=3.0))
+    assert h != card_hash(deck, BACK, "", spec)
+
+
+def _fake_render(*args) -> int:
+    out_path = args[-1]
+    with open(out_path, "wb") as f:
+        f.write(b"png")
+    return 3
+
+
+def test_reexport_skips_unchanged(deck, tmp_path, monkeypatch):
+    # rendering itself is stubbed: this checks which files a re-export rebuilds
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", concurrent.futures.ThreadPoolExecutor)
+    monkeypatch.setattr(export_deck, "_render_card", _fake_render)
+    monkeypatch.setattr(export_deck, "_render_sheet", _fake_render)
+    monkeypatch.setattr(export_deck, "write_pdf", lambda pages, spec, out_path: _fake_render(out_path))
+    out = str(tmp_path)
+
+    first = run_export(out_dir=out, backs=True)
+    n_cards = len(card_jobs(deck))
+    assert len(first["cards"]) == n_cards
+    assert len(first["built"]) == n_cards + len(first["sheets"]) + 1
+
+    assert run_export(out_dir=out, backs=True)["built"] == []
+
+    # one card file gone: only that card is rebuilt, its sheet and the PDF are still current
+    name = card_jobs(deck)[1][0]
+    os.remove(os.path.join(out, first["cards"][name]["file"]))
+    again = run_export(out_dir=out, backs=True)
+    assert again["built"] == [first["cards"][name]["file"]]
+
+    # different print settings change every hash
+    assert len(run_export(out_dir=out, backs=True, bleed_mm=3.0)["built"]) == len(first["built"])
+    with open(os.path.join(out, export_deck.MANIFEST_NAME), encoding="utf-8") as f:
+        assert json.load(f)["spec"]["bleed"] == print_spec(bleed_mm=3.0).bleed
+
+
+def test_render_placeholder_card_at_print_size(deck, tmp_path):
+    pytest.importorskip("PIL")
+    spec = print_spec(dpi=150)
+    name, _, label, story = card_jobs(deck)[1]
+    out = str(tmp_path / "card.png")
+    assert export_deck._render_card(name, None, label, story, spec, out) > 0
+    from PIL import Image
+    with Image.open(out) as img:
+        assert img.size == spec.cell
@@ -0,0 +1,68 @@
+# warmup.py
+# Background warm-up for the shared asset cache: a bounded thread pool that runs
+# load/encode tasks ahead of the first flip or zoom (at server start, on deck
+# reload, and per phase when its first card is flipped). Tasks are plain
+# callables; one already queued or running under the same key is not queued again.
+
+import threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Hashable, Iterable, Set, Tuple
+
+Task = Tuple[Hashable, Callable[[], object]]
+
+
+class Warmup:
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup")
+        self._lock = threading.Lock()
+        self._pending: Set[Hashable] = set()
+        self.label = ""
+        self.total = self.done = self.failed = 0
+        self.errors: Deque[str] = deque(maxlen=20)
+        self._started = self._finished = 0.0
+
+    def submit(self, label: str, tasks: Iterable[Task]) -> int:
+        """Queue `tasks`; returns how many were new. Progress restarts when idle."""
+        n = 0
+        with self._lock:
+            for key, func in tasks:
+                if key in self._pending:
+                    continue
+                if not self._pending:
+                    self.total = self.done = self.failed = 0
+                    self._started = time.monotonic()
+                self._pending.add(key)
+                self.total += 1
+                n += 1
+                self._pool.submit(self._run, key, func)
+            if n:
+                self.label = label
+        return n
+
+    def _run(self, key: Hashable, func: Callable[[], object]):
+        try:
+            func()
+            failed = False
+        except Exception as e:
+            failed = True
+            self.errors.append(f"{key}: {e}")
+        with self._lock:
+            self._pending.discard(key)
+            self.done += 1
+            self.failed += failed
+            if not self._pending:
+                self._finished = time.monotonic()
+
+    def progress(self) -> Dict:
+        with self._lock:
+            busy = bool(self._pending)
+            end = time.monotonic() if busy else self._finished
+            return {
+                "label": self.label,
+                "total": self.total,
+                "done": self.done,
+                "failed": self.failed,
+                "busy": busy,
+                "seconds": max(end - self._started, 0.0) if self._started else 0.0,
+            }
@@ -0,0 +1,78 @@
+# zoom_pyramid.py
+# Precomputed zoom levels for flipped cards.
+# A card's image is decoded once and every slider step is resized/encoded in a
+# background thread pool, so moving the zoom slider is a cache lookup.
+
+import io, threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Tuple
+
+ZOOM_LEVELS = tuple(round(1.0 + 0.1 * i, 1) for i in range(11))  # slider: 1.0–2.0 step 0.1
+
+
+class ZoomPyramid:
+    """Per-card decoded image + one PNG per zoom level, LRU-bounded by card count."""
+
+    def __init__(self, base_size: Tuple[int, int], levels: Tuple[float, ...] = ZOOM_LEVELS,
+                 max_workers: int = 4, max_cards: int = 64):
+        self.base_size = base_size
+        self.levels = levels
+        self.max_cards = max_cards
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="zoom")
+        self._lock = threading.Lock()
+        # key -> {"image": Future[Image], level: Future[bytes], ...}
+        self._cards: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def prefetch(self, key: Hashable, load: Callable[[], bytes], first: float = 1.6) -> None:
+        """Schedule decode + every zoom level for `key` (no-op if already scheduled)."""
+        with self._lock:
+            if key in self._cards:
+                self._cards.move_to_end(key)
+                return
+            decoded = self._pool.submit(_decode, load)
+            futures: Dict = {"image": decoded}
+            # the slider's default level first, then the rest
+            for level in sorted(self.levels, key=lambda lv: (lv != first, lv)):
+                futures[level] = self._pool.submit(self._resize, decoded, level)
+            self._cards[key] = futures
+            while len(self._cards) > self.max_cards:
+                _, old = self._cards.popitem(last=False)
+                for fut in old.values():
+                    fut.cancel()
+
+    def get(self, key: Hashable, load: Callable[[], bytes], scale: float) -> bytes:
+        """PNG bytes of `key` at `scale` (snapped to the nearest level)."""
+        level = min(self.levels, key=lambda lv: abs(lv - scale))
+        with self._lock:
+            futures = self._cards.get(key)
+            ready = futures is not None and futures[level].done() and not futures[level].cancelled()
+        if futures is None:
+            self.prefetch(key, load, first=level)
+            with self._lock:
+                futures = self._cards[key]
+        if ready:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return futures[level].result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cards": len(self._cards)}
+
+    def _resize(self, decoded: Future, level: float) -> bytes:
+        img = decoded.result()
+        resized = img.resize((int(self.base_size[0] * level), int(self.base_size[1] * level)))
+        buf = io.BytesIO()
+        resized.save(buf, format="PNG")
+        return buf.getvalue()
+
+
+def _decode(load: Callable[[], bytes]):
+    from PIL import Image
+    img = Image.open(io.BytesIO(load()))
+    img.load()
+    return img